@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Path, status, UploadFile, File, Form, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query, Path, status, UploadFile, File, Form
 from fastapi.responses import FileResponse, StreamingResponse
 import httpx
 from typing import List, Optional, Dict, Any, Set
@@ -6,7 +6,6 @@ from sqlalchemy.orm import Session
 import json
 import csv
 import logging
-import asyncio
 import os
 import uuid
 from io import StringIO
@@ -18,8 +17,10 @@ from app.models.paper import Paper as PaperModel
 from app.services.paper import create_paper, get_paper_by_id, update_paper, delete_paper, list_papers, list_imported_papers
 from app.models.paper import PaperStatus
 from app.services.pdf_service import get_paper_pdf_url, get_paper_details
-from app.services.doi_service import get_doi_for_paper, get_dois_for_papers
-from app.services.openalex_direct import search_papers_direct
+from app.services.doi_service import find_paper_match
+from app.services.batch_csv import (
+    BatchCSVReader, open_batch_csv, stream_batch_results, MEDIA_TYPES, FORMAT_CSV, FORMAT_JSON, FORMAT_NDJSON
+)
 from app.services.pdf_extraction import process_pdf_file, extract_metadata_from_pdf, enhance_metadata_with_api, store_pdf_file
 from app.services.project import add_paper_to_project
 from app.db.session import get_db
@@ -324,45 +325,21 @@ async def find_paper_doi(
     
     Uses a two-step process:
     1. Search OpenAlex directly with the provided metadata
-    2. Apply matching algorithms to find the most relevant paper
+    2. Score the candidates with fuzzy title/author/year matching and accept
+       the best one if it reaches DOI_MATCH_THRESHOLD
     
     Returns a DOI if found, along with open access URL if available.
     """
     try:
-        # Use OpenAlex search directly for more control
         logger.info(f"Finding DOI for: '{title}' by {author} ({year})")
         
-        # Use the consolidated direct search function
-        results, count = await search_papers_direct(
-            query=title,
-            per_page=3,  # Get top 3 results to improve matching chances
-            page=1,
-            year_from=int(year) if year else None, # Ensure year is int
-            year_to=int(year) if year else None,   # Ensure year is int
-            author=author,
-            sort="relevance"
-        )
+        match = await find_paper_match(title, author, year)
         
-        if results and count > 0:
-            # Get the DOI from the first result
-            doi = results[0].get("doi")
-            pdf_url = results[0].get("open_access_url")
-            
-            if doi:
-                logger.info(f"Found DOI: {doi}")
-                return {
-                    "doi": doi, 
-                    "status": "success",
-                    "pdf_url": pdf_url
-                }
-        
-        # If the direct search didn't work, try the backup method
-        logger.info("Direct search failed, trying backup DOI lookup method")
-        doi = await get_doi_for_paper(title, author, year)
-        
-        if doi:
-            # Also get PDF URL if available
-            pdf_url = await get_paper_pdf_url(doi)
+        if match:
+            doi = match["doi"]
+            logger.info(f"Found DOI: {doi}")
+            # The matched record is the OpenAlex record, so no second OpenAlex lookup is needed
+            pdf_url = await get_paper_pdf_url(doi, openalex_paper=match)
             
             return {
                 "doi": doi, 
@@ -377,10 +354,17 @@ async def find_paper_doi(
         raise HTTPException(status_code=500, detail=f"Error finding DOI: {str(e)}")
 
 
-@router.post("/batch-find-doi", response_model=List[Dict[str, Any]])
+def _batch_response(reader: BatchCSVReader, fmt: str) -> StreamingResponse:
+    headers = {}
+    if fmt == FORMAT_CSV:
+        headers["Content-Disposition"] = 'attachment; filename="doi_results.csv"'
+    return StreamingResponse(stream_batch_results(reader, fmt), media_type=MEDIA_TYPES[fmt], headers=headers)
+
+
+@router.post("/batch-find-doi")
 async def batch_find_dois(
     file: UploadFile = File(...),
-    background_tasks: BackgroundTasks = None,
+    format: str = Query(FORMAT_JSON, description="Response format: json (array), ndjson or csv"),
 ):
     """
     Find DOIs for multiple papers from a CSV file using OpenAlex.
@@ -393,51 +377,43 @@ async def batch_find_dois(
     The system processes each entry through OpenAlex to find matching DOIs
     and open access PDF links where available. Results maintain the original
     input data plus any found DOIs and PDF URLs.
+    
+    The upload is parsed and resolved in chunks of DOI_BATCH_CHUNK_SIZE rows
+    and the response is streamed as each chunk finishes: a JSON array or CSV
+    in input order, or NDJSON with each row written as soon as it is resolved
+    (with its 0-based CSV position in 'row').
     """
+    if format not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported format '{format}'; use json, ndjson or csv")
     try:
-        # Read the CSV file
-        content = await file.read()
-        text_content = content.decode("utf-8-sig")
-        
-        # Process CSV content into paper dictionaries
-        import csv
-        from io import StringIO
-        
-        reader = csv.DictReader(StringIO(text_content))
-        papers = list(reader)
-        
-        # Check if required fields exist
-        required_columns = ['title', 'authors', 'year']
-        for paper in papers:
-            if not all(key in paper for key in required_columns):
-                logger.error(f"CSV must contain 'title', 'authors', and 'year' columns")
-                raise ValueError("CSV must contain 'title', 'authors', and 'year' columns")
-        
-        # Find DOIs for the papers
-        results = await get_dois_for_papers(papers)
-        
-        # Add PDF URLs to papers with DOIs
-        results_with_pdf = []
-        
-        for paper in results:
-            doi = paper.get('doi')
-            if doi and doi != "Not found":
-                pdf_url = await get_paper_pdf_url(doi)
-                paper['pdf_url'] = pdf_url if pdf_url else "Not found"
-            else:
-                paper['pdf_url'] = "No DOI"
-            
-            results_with_pdf.append(paper)
-            
-            # Add a small delay to avoid rate limiting
-            await asyncio.sleep(0.5)
-        
-        return results_with_pdf
+        reader = await open_batch_csv(file.file)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing CSV file: {str(e)}")
+    
+    return _batch_response(reader, format)
+
+
+@router.post("/batch-find-doi/stream")
+async def batch_find_dois_stream(
+    file: UploadFile = File(...),
+):
+    """
+    Find DOIs and PDF URLs for a CSV of papers, streaming results as NDJSON.
     
+    Same as /batch-find-doi?format=ndjson: each row is written as one JSON
+    line as soon as it is resolved; its 'row' field is the 0-based position
+    in the CSV. Rows that failed carry an 'error' field.
+    """
+    try:
+        reader = await open_batch_csv(file.file)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing CSV file: {str(e)}")
+    
+    return _batch_response(reader, FORMAT_NDJSON)
 
 
 @router.post("/upload", response_model=PaperSchema)
@@ -13,7 +13,7 @@ from app.models.project import paper_project, Project as ProjectModel
 from app.schemas.paper import Paper as PaperSchema
 from app.services.paper import get_paper_by_id, update_paper, list_papers
 from app.services.pdf_service import get_paper_pdf_url
-from app.services.openalex_direct import get_paper_by_doi_direct, search_papers_direct
+from app.services.openalex_direct import get_paper_by_doi_direct, get_papers_by_dois_direct, search_papers_direct, normalize_doi
 from app.services.pdf_extraction import merge_metadata
 from app.api import deps
 from app.models.user import User as UserModel
@@ -317,6 +317,62 @@ async def fetch_and_update_metadata(
         logger.exception(f"Error fetching/updating metadata for paper {paper_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch or update metadata: {str(e)}")
 
+@router.post("/projects/{project_id}/fetch-metadata", response_model=Dict[str, Any])
+async def fetch_and_update_project_metadata(
+    project_id: int = Path(..., description="The ID of the project to refresh metadata for"),
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(deps.get_current_active_user)
+):
+    """
+    Refresh metadata from OpenAlex for every paper with a DOI in a project.
+    
+    DOIs are resolved with batched OpenAlex queries (50 DOIs per request)
+    instead of one request per paper.
+    """
+    project = db.query(ProjectModel).filter(ProjectModel.id == project_id,
+                                           ProjectModel.owner_id == current_user.id).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found or not owned by user")
+
+    papers = db.query(PaperModel)\
+               .join(paper_project)\
+               .filter(paper_project.c.project_id == project_id)\
+               .filter(PaperModel.doi.isnot(None))\
+               .all()
+
+    try:
+        api_papers = await get_papers_by_dois_direct([paper.doi for paper in papers])
+    except Exception as e:
+        logger.exception(f"Error fetching metadata for project {project_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch metadata: {str(e)}")
+
+    updated_ids = []
+    not_found_ids = []
+    for paper in papers:
+        api_metadata = api_papers.get(normalize_doi(paper.doi))
+        if not api_metadata:
+            not_found_ids.append(paper.id)
+            continue
+        try:
+            current_metadata = PaperSchema.from_orm(paper).dict()
+            merged_data = merge_metadata(current_metadata, api_metadata)
+            update_data = {k: v for k, v in merged_data.items() if hasattr(PaperModel, k) and k not in ['id', 'created_at', 'updated_at']}
+            update_paper(db, paper.id, update_data, owner_id=current_user.id)
+            updated_ids.append(paper.id)
+        except Exception as e:
+            logger.error(f"Error updating metadata for paper {paper.id}: {str(e)}")
+            db.rollback()
+            not_found_ids.append(paper.id)
+
+    logger.info(f"Refreshed metadata for {len(updated_ids)}/{len(papers)} papers in project {project_id}")
+    return {
+        "status": "success",
+        "updated_count": len(updated_ids),
+        "not_found_count": len(not_found_ids),
+        "updated_ids": updated_ids,
+        "not_found_ids": not_found_ids
+    }
+
 # Add a new endpoint to manually mark a paper as ready for coding
 @router.put("/papers/{paper_id}/mark-ready", response_model=PaperSchema)
 async def mark_paper_ready_for_coding(
@@ -1,32 +1,70 @@
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, Query, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from typing import Optional, Dict, Any, List
 
+import json
 import logging
 import httpx
 
 # Updated import to use the consolidated direct client
-from app.services.openalex_direct import search_papers_direct
+from app.services.openalex_direct import (
+    search_papers_window, iter_search_results, get_search_facets, get_work_abstract,
+    search_cache, facet_cache, FACET_FIELDS, MAX_PAGED_RESULTS
+)
+from app.services.http_client import OPENALEX, UNPAYWALL
+from app.services.latency import latency_stats
+from app.services.circuit_breaker import breaker_stats
+from app.services import unpaywall_cache
+from app.services.rate_limit import get_limiter
+from app.services.circuit_breaker import get_breaker
+from app.services.search_prefetch import search_prefetcher
+from app.services.openalex_autocomplete import (
+    autocomplete, autocomplete_cache, autocomplete_debouncer, ENTITIES
+)
+from app.core.config import settings
+from app.core import security
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+
+def _session_id(request: Request) -> str:
+    """Identify the searching user for prefetch bookkeeping: the logged-in user if any, else the client address."""
+    auth = request.headers.get("Authorization", "")
+    if auth.lower().startswith("bearer "):
+        user_id = security.decode_token(auth[7:])
+        if user_id:
+            return f"user:{user_id}"
+    return f"client:{request.client.host if request.client else 'unknown'}"
+
+
 @router.get("/search/papers")
 async def search_papers(
+    request: Request,
     query: str = Query(..., description="Search query"),
-    limit: int = Query(100, description="Number of results to return"),
-    offset: int = Query(0, description="Number of results to skip"),
+    limit: int = Query(100, ge=0, le=MAX_PAGED_RESULTS, description="Number of results to return"),
+    offset: int = Query(0, ge=0, description="Number of results to skip"),
     year_from: Optional[int] = Query(None, description="Filter from year"),
     year_to: Optional[int] = Query(None, description="Filter to year"),
-    journal: Optional[str] = Query(None, description="Filter by journal name"),
-    author: Optional[str] = Query(None, description="Filter by author name"),
+    journal: Optional[str] = Query(None, description="Filter by journal name, or exact source ID from /search/autocomplete/sources"),
+    author: Optional[str] = Query(None, description="Filter by author name, or exact author ID from /search/autocomplete/authors"),
     open_access_only: bool = Query(False, description="Filter to open access only"),
     sort: str = Query("relevance", description="Sort results by (relevance, date, cited, title)"),
+    include_abstract: bool = Query(True, description="Include abstracts (set false for title-only lists)"),
 ):
     """
     Search for papers using OpenAlex API.
     
-    This endpoint maps directly to OpenAlex's works endpoint with appropriate parameters.
+    Any (offset, limit) window is served, including limits above OpenAlex's
+    200-per-page cap: the window is split into the fewest OpenAlex pages,
+    which are fetched concurrently and sliced back to the exact window.
+    
+    Once a client pages through a search in order, the following window is
+    prefetched in the background so the next page is served from the cache.
+    
+    The metadata echoes offset/limit, plus the equivalent page/perPage kept
+    for clients of the older page-based response.
     """
     try:
         # Validate query parameter
@@ -41,23 +79,34 @@ async def search_papers(
         logger.info(f"Search params: query={query}, filters: year_from={year_from}, year_to={year_to}, "
                   f"journal={journal}, author={author}, open_access_only={open_access_only}, sort={sort}")
         
-        try:
-            # Use the consolidated direct search function
-            # Map limit/offset to page/per_page
-            per_page = limit
-            page = (offset // per_page) + 1 if per_page > 0 else 1
-            
-            results, total_count = await search_papers_direct(
-                query=query, 
-                page=page,
-                per_page=per_page,
+        def window_fetch(window_offset: int):
+            # Fetch the (offset, limit) window as concurrent OpenAlex pages
+            return lambda: search_papers_window(
+                query=query,
+                offset=window_offset,
+                limit=limit,
                 year_from=year_from,
                 year_to=year_to,
                 journal=journal,
                 author=author,
                 open_access_only=open_access_only,
-                sort=sort
+                sort=sort,
+                include_abstract=include_abstract
+            )
+        
+        user = _session_id(request)
+        search_key = (query.strip().lower(), year_from, year_to, journal, author, open_access_only, sort, include_abstract)
+        paginating = search_prefetcher.enabled and search_prefetcher.record(user, search_key, offset, limit)
+        
+        try:
+            results, total_count = await search_prefetcher.fetch(
+                user, (search_key, offset, limit), window_fetch(offset)
             )
+            
+            next_offset = offset + limit
+            if (paginating and results and next_offset < min(total_count, MAX_PAGED_RESULTS)
+                    and not get_breaker(OPENALEX).is_open):
+                search_prefetcher.schedule(user, (search_key, next_offset, limit), window_fetch(next_offset))
         except Exception as e:
             logger.error(f"Error from OpenAlex direct search service: {str(e)}")
             results = []
@@ -76,8 +125,10 @@ async def search_papers(
                     "openAccessOnly": open_access_only
                 },
                 "sortBy": sort,
-                "page": page, # Return page/per_page used
-                "perPage": per_page
+                "offset": offset,
+                "limit": limit,
+                "page": (offset // limit) + 1 if limit > 0 else 1,
+                "perPage": limit
             }
         }
     except Exception as e:
@@ -86,3 +137,157 @@ async def search_papers(
         if not error_msg or error_msg == '{}':
             error_msg = f"Error processing search request: {type(e).__name__}"
         raise HTTPException(status_code=500, detail=error_msg)
+
+
+@router.get("/search/facets")
+async def search_facets(
+    query: str = Query(..., description="Search query"),
+    facets: Optional[str] = Query(None, description=f"Comma-separated facets to count (default: {','.join(FACET_FIELDS)})"),
+    year_from: Optional[int] = Query(None, description="Filter from year"),
+    year_to: Optional[int] = Query(None, description="Filter to year"),
+    journal: Optional[str] = Query(None, description="Filter by journal name, or exact source ID from /search/autocomplete/sources"),
+    author: Optional[str] = Query(None, description="Filter by author name, or exact author ID from /search/autocomplete/authors"),
+    open_access_only: bool = Query(False, description="Filter to open access only"),
+):
+    """
+    Get result counts per facet (year, source, open access, type) for a search.
+    
+    Backed by OpenAlex group_by, so no work records are downloaded; use it to
+    build filter UIs such as a year histogram or top-journal list.
+    """
+    if not query or query.strip() == "":
+        raise HTTPException(status_code=400, detail="Please provide a search term")
+    
+    requested = [f.strip() for f in facets.split(",") if f.strip()] if facets else None
+    unknown = [f for f in requested or [] if f not in FACET_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unsupported facets: {', '.join(unknown)}")
+    
+    try:
+        counts = await get_search_facets(
+            query=query,
+            facets=requested,
+            year_from=year_from,
+            year_to=year_to,
+            journal=journal,
+            author=author,
+            open_access_only=open_access_only
+        )
+    except Exception as e:
+        logger.error(f"Error fetching search facets: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error fetching search facets: {str(e)}")
+    
+    return {"facets": counts, "metadata": {"query": query}}
+
+
+@router.get("/search/papers/export")
+async def export_search_results(
+    query: str = Query(..., description="Search query"),
+    max_results: Optional[int] = Query(None, ge=1, description="Stop after this many results (default: all)"),
+    year_from: Optional[int] = Query(None, description="Filter from year"),
+    year_to: Optional[int] = Query(None, description="Filter to year"),
+    journal: Optional[str] = Query(None, description="Filter by journal name, or exact source ID from /search/autocomplete/sources"),
+    author: Optional[str] = Query(None, description="Filter by author name, or exact author ID from /search/autocomplete/authors"),
+    open_access_only: bool = Query(False, description="Filter to open access only"),
+    sort: str = Query("relevance", description="Sort results by (relevance, date, cited, title)"),
+    include_abstract: bool = Query(True, description="Include abstracts"),
+):
+    """
+    Stream the full result set of a search as NDJSON (one paper per line).
+    
+    Uses OpenAlex cursor paging, so it is not limited to the first 10,000
+    results, and streams works as pages arrive instead of buffering them.
+    """
+    if not query or query.strip() == "":
+        raise HTTPException(status_code=400, detail="Please provide a search term")
+    
+    async def stream_results():
+        try:
+            async for paper in iter_search_results(
+                query=query,
+                year_from=year_from,
+                year_to=year_to,
+                journal=journal,
+                author=author,
+                open_access_only=open_access_only,
+                sort=sort,
+                include_abstract=include_abstract,
+                max_results=max_results
+            ):
+                yield json.dumps(paper) + "\n"
+        except Exception as e:
+            # Headers are already sent, so report the failure in-band as the final line
+            logger.error(f"Error exporting search results: {str(e)}")
+            yield json.dumps({"error": str(e)}) + "\n"
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+
+@router.get("/search/autocomplete/{entity}")
+async def search_autocomplete(
+    request: Request,
+    entity: str,
+    q: str = Query(..., description="Text typed so far"),
+):
+    """
+    Typeahead suggestions for the journal ("sources") and author ("authors") filters.
+    
+    Pass the returned `id` back as the journal/author search filter to get an
+    exact-ID filter instead of a slower free-text match. Rapid keystrokes from
+    the same client are debounced: superseded requests return no results.
+    """
+    if entity not in ENTITIES:
+        raise HTTPException(status_code=404, detail=f"Unknown autocomplete type: {entity}")
+    
+    if not await autocomplete_debouncer.wait(_session_id(request) + entity, settings.AUTOCOMPLETE_DEBOUNCE_MS / 1000):
+        return {"results": [], "superseded": True}
+    
+    try:
+        results = await autocomplete(entity, q)
+    except Exception as e:
+        logger.error(f"Error in {entity} autocomplete: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error in autocomplete: {str(e)}")
+    return {"results": results, "superseded": False}
+
+
+@router.get("/search/works/{work_id}/abstract")
+async def get_search_result_abstract(work_id: str):
+    """
+    Get the abstract of a single search result on demand.
+    
+    Pairs with include_abstract=false on /search/papers: list views skip
+    abstracts and fetch them only for the results a user expands.
+    """
+    abstract = await get_work_abstract(work_id)
+    if abstract is None:
+        raise HTTPException(status_code=404, detail="No abstract available for this work")
+    return {"id": work_id, "abstract": abstract}
+
+
+@router.get("/search/cache/stats")
+async def get_search_cache_stats():
+    """
+    Get hit/miss counters and occupancy of the search, facet and autocomplete
+    caches, and speculative next-page prefetch counters.
+    """
+    return {
+        "search": search_cache.stats(),
+        "facets": facet_cache.stats(),
+        "autocomplete": autocomplete_cache.stats(),
+        "prefetch": search_prefetcher.stats(),
+    }
+
+
+@router.get("/search/upstream/stats")
+async def get_upstream_stats():
+    """
+    Get per-endpoint latency percentiles (which drive the adaptive timeouts and
+    hedging), circuit breaker state, rate limiter state and Unpaywall cache
+    statistics for the external scholarly APIs.
+    """
+    return {
+        "latency": latency_stats(),
+        "circuit_breakers": breaker_stats(),
+        "unpaywall_cache": unpaywall_cache.stats(),
+        "rate_limits": {name: get_limiter(name).stats() for name in (OPENALEX, UNPAYWALL)},
+    }
@@ -16,6 +16,96 @@ class Settings(BaseSettings):
     OPENALEX_EMAIL: str = os.getenv("OPENALEX_EMAIL", "user@example.com")
     UNPAYWALL_EMAIL: str = os.getenv("UNPAYWALL_EMAIL", "user@example.com")
     
+    # External API endpoints (point both at mock_server.py, e.g. http://127.0.0.1:8001, for offline load tests)
+    OPENALEX_BASE_URL: str = "https://api.openalex.org"
+    UNPAYWALL_BASE_URL: str = "https://api.unpaywall.org"
+    
+    # Record/replay of upstream responses: "off", "record" or "replay" (one cassette file per host)
+    HTTP_CASSETTE_MODE: str = "off"
+    HTTP_CASSETTE_DIR: str = "./cassettes"
+    
+    # Shared HTTP client pool (one pooled client per external host)
+    HTTP2_ENABLED: bool = True
+    HTTP_MAX_CONNECTIONS: int = 20
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0  # seconds
+    HTTP_CONNECT_TIMEOUT: float = 5.0  # seconds
+    
+    # Per-call read timeouts (seconds)
+    OPENALEX_SEARCH_TIMEOUT: float = 30.0
+    OPENALEX_LOOKUP_TIMEOUT: float = 15.0
+    UNPAYWALL_TIMEOUT: float = 10.0
+    
+    # Shared per-host rate limits (token bucket); a quota of 0 means unlimited
+    OPENALEX_RATE_PER_SECOND: float = 10.0
+    OPENALEX_RATE_BURST: int = 10
+    OPENALEX_DAILY_QUOTA: int = 100000
+    UNPAYWALL_RATE_PER_SECOND: float = 10.0
+    UNPAYWALL_RATE_BURST: int = 10
+    UNPAYWALL_DAILY_QUOTA: int = 100000
+    
+    # Adaptive read timeouts from observed per-endpoint latency (the fixed timeouts above are the ceiling)
+    ADAPTIVE_TIMEOUTS_ENABLED: bool = True
+    ADAPTIVE_TIMEOUT_MULTIPLIER: float = 2.0  # timeout = observed p99 x this
+    ADAPTIVE_TIMEOUT_MIN: float = 2.0  # seconds
+    LATENCY_WINDOW: int = 500  # recent samples kept per endpoint type
+    LATENCY_MIN_SAMPLES: int = 20  # samples needed before timeouts adapt / hedging starts
+    # Send a duplicate request when a lookup is slower than the observed p95
+    HEDGED_REQUESTS_ENABLED: bool = False
+    
+    # Per-host circuit breaker: open after this many consecutive failures, probe again after the timeout
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = 5
+    CIRCUIT_BREAKER_RECOVERY_TIMEOUT: float = 30.0  # seconds
+    
+    # PDF URL resolution: "sequential" (OpenAlex, then Unpaywall) or "race" (both at once)
+    PDF_URL_STRATEGY: str = "sequential"
+    # When racing: "openalex", "unpaywall" or "first" (whichever source answers first with a URL)
+    PDF_URL_PREFERENCE: str = "openalex"
+    PDF_URL_PREFERENCE_GRACE: float = 0.5  # seconds to wait for the preferred source once the other has a URL
+    
+    # Maximum concurrent requests when fanning out batched OpenAlex lookups
+    OPENALEX_BATCH_CONCURRENCY: int = 5
+    # Default worker count for bulk Unpaywall lookups (get_unpaywall_data_many)
+    UNPAYWALL_BATCH_CONCURRENCY: int = 10
+    # Rows resolved at once by the batch DOI finder (requests are still paced by the shared rate limiters)
+    DOI_BATCH_CONCURRENCY: int = 8
+    # Uploaded CSV rows parsed and resolved per chunk (bounds batch-find-doi memory use)
+    DOI_BATCH_CHUNK_SIZE: int = 500
+    # DOI lookup by title/author/year: candidates fetched per query, and the minimum fuzzy match score (0-1)
+    DOI_MATCH_CANDIDATES: int = 10
+    DOI_MATCH_THRESHOLD: float = 0.75
+    
+    # In-process search response cache (set max entries to 0 to disable)
+    SEARCH_CACHE_MAX_ENTRIES: int = 512
+    SEARCH_CACHE_TTL: float = 300.0  # seconds an entry is served as fresh
+    SEARCH_CACHE_STALE_TTL: float = 1800.0  # extra seconds served stale while refreshing
+    
+    # Typeahead for the journal/author filters
+    AUTOCOMPLETE_CACHE_MAX_ENTRIES: int = 2048
+    AUTOCOMPLETE_CACHE_TTL: float = 3600.0  # seconds
+    AUTOCOMPLETE_DEBOUNCE_MS: float = 150.0  # wait for the client to stop typing (0 disables)
+    
+    # Speculative prefetch of the next /search/papers page for clients that page through results
+    SEARCH_PREFETCH_ENABLED: bool = True
+    SEARCH_PREFETCH_MIN_PAGES: int = 1  # in-order page turns before a session gets prefetching
+    SEARCH_PREFETCH_MAX_PER_USER: int = 2  # concurrent prefetches per user
+    
+    # Persistent local store of fetched OpenAlex works
+    WORK_STORE_ENABLED: bool = True
+    WORK_STORE_MAX_AGE_DAYS: float = 30.0  # revalidate records older than this
+    
+    # Persistent cache of Unpaywall answers; negative answers (unknown DOI, no OA copy) rarely change
+    UNPAYWALL_CACHE_ENABLED: bool = True
+    UNPAYWALL_CACHE_TTL_DAYS: float = 7.0
+    UNPAYWALL_NEGATIVE_CACHE_TTL_DAYS: float = 30.0
+    
+    # Consult Unpaywall data imported from a snapshot (see ingest_unpaywall_snapshot.py) before the API
+    UNPAYWALL_LOCAL_ENABLED: bool = True
+    
+    # Local index built from an OpenAlex snapshot (see ingest_openalex_snapshot.py):
+    # "off", "prefer" (local first, API when nothing matches) or "only" (never call the API)
+    OPENALEX_LOCAL_MODE: str = "off"
+    
     # Security
     SECRET_KEY: str = os.getenv("SECRET_KEY", "development_secret_key")
     
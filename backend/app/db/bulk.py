@@ -0,0 +1,62 @@
+"""
+Helpers shared by the DOI-keyed caches and local data tables (OpenAlex work
+store, Unpaywall cache, local OpenAlex index, local Unpaywall snapshot).
+"""
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Column, Table
+from sqlalchemy.engine import Connection, RowMapping
+from sqlalchemy.orm import Session
+
+# Keys per IN (...) query, well below SQLite's bound-parameter limit
+IN_QUERY_CHUNK_SIZE = 500
+
+
+def select_in(bind: Any, column: Column, keys: Sequence[Any]) -> Iterator[RowMapping]:
+    """
+    Select every row of column's table whose column value is in keys.
+
+    Keys are queried IN_QUERY_CHUNK_SIZE at a time.
+
+    Args:
+        bind: A Session or Connection
+        column: Table column to match (e.g. Model.__table__.c.doi)
+        keys: Values to look up
+    """
+    for i in range(0, len(keys), IN_QUERY_CHUNK_SIZE):
+        statement = column.table.select().where(column.in_(keys[i:i + IN_QUERY_CHUNK_SIZE]))
+        yield from bind.execute(statement).mappings()
+
+
+def upsert_row(db: Session, model: Any, keys: List[Tuple[Any, Optional[Any]]], values: Dict[str, Any]) -> Any:
+    """
+    Update the first row matching one of keys, or add a new one, and flush.
+
+    Args:
+        db: Session to write in (the caller commits)
+        model: Mapped class
+        keys: (model attribute, value) pairs tried in order; None values are skipped
+        values: Attributes to set on the row
+    """
+    row = None
+    for attribute, value in keys:
+        if value is not None:
+            row = db.query(model).filter(attribute == value).first()
+            if row is not None:
+                break
+    if row is None:
+        row = model(**{attribute.key: value for attribute, value in keys})
+        db.add(row)
+    for name, value in values.items():
+        setattr(row, name, value)
+    # Flush per row so a key seen twice in one batch updates instead of duplicating
+    db.flush()
+    return row
+
+
+def insert_or_replace(conn: Connection, table: Table, rows: List[Dict[str, Any]]) -> None:
+    """Bulk-insert rows; on SQLite, rows with an existing unique key replace the old ones."""
+    insert = table.insert()
+    if conn.dialect.name == "sqlite":
+        insert = insert.prefix_with("OR REPLACE")
+    conn.execute(insert, rows)
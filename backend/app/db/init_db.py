@@ -17,10 +17,15 @@ def init_db() -> None:
     from app.models.project import Project, paper_project
     from app.models.coding import CodingSheet, CodingData # Keep coding models
     from app.models.user import User # Add User model
+    from app.models.openalex_work import OpenAlexWork # Local OpenAlex work store
+    from app.models.local_work import LocalWork # Offline OpenAlex snapshot index
+    from app.models.unpaywall_record import UnpaywallRecord # Unpaywall response cache
+    from app.models.unpaywall_local import LocalUnpaywallRecord # Offline Unpaywall snapshot data
+    from app.services.local_index import init_local_index
 
 
     
-    logger.info("Initializing database with models: User, Paper, Project, CodingSheet, CodingData")
+    logger.info("Initializing database with models: User, Paper, Project, CodingSheet, CodingData, OpenAlexWork, LocalWork, UnpaywallRecord, LocalUnpaywallRecord")
     
     inspector = inspect(engine)
     tables_before = set(inspector.get_table_names())
@@ -28,6 +33,7 @@ def init_db() -> None:
     
     # Create tables if they don't exist
     Base.metadata.create_all(bind=engine, checkfirst=True) # Use checkfirst=True
+    init_local_index(engine) # Full-text table for the local snapshot index (not an ORM model)
     
     tables_after = set(inspector.get_table_names())
     logger.info(f"Tables after creation: {tables_after}")
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, String, Boolean, DateTime, JSON, Integer, BigInteger
+
+from app.db.base_class import Base
+
+
+class LocalWork(Base):
+    """
+    OpenAlex work ingested from an offline snapshot into the local search index.
+    
+    The primary key is the numeric part of the OpenAlex ID (W123 -> 123), which is
+    also the rowid of the matching row in the full-text table (see local_index).
+    """
+    __tablename__ = 'openalex_local_work'
+    
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=False)
+    openalex_id = Column(String, unique=True, nullable=False)
+    doi = Column(String, index=True, nullable=True)  # Normalized bare DOI
+    title = Column(String, nullable=True)
+    publication_year = Column(Integer, index=True, nullable=True)
+    publication_date = Column(String, nullable=True)
+    journal = Column(String, index=True, nullable=True)
+    source_id = Column(String, index=True, nullable=True)
+    is_oa = Column(Boolean, index=True, default=False)
+    cited_by_count = Column(Integer, index=True, default=0)
+    data = Column(JSON, nullable=False)  # Formatted paper dict as returned by openalex_direct
+    ingested_at = Column(DateTime, nullable=False)
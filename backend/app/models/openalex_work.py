@@ -0,0 +1,15 @@
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, JSON, Integer
+
+from app.db.base_class import Base
+
+
+class OpenAlexWork(Base):
+    """Locally stored, already formatted OpenAlex work record (shared across users)."""
+    __tablename__ = 'openalex_work'
+    
+    id = Column(Integer, primary_key=True, index=True)
+    openalex_id = Column(String, unique=True, index=True, nullable=True)
+    doi = Column(String, unique=True, index=True, nullable=True)  # Normalized bare DOI
+    data = Column(JSON, nullable=False)  # Formatted paper dict as returned by openalex_direct
+    fetched_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, String, Boolean, DateTime, JSON, Integer
+
+from app.db.base_class import Base
+
+
+class LocalUnpaywallRecord(Base):
+    """Unpaywall record imported from an offline data snapshot (see unpaywall_snapshot)."""
+    __tablename__ = 'unpaywall_local'
+    
+    id = Column(Integer, primary_key=True)
+    doi = Column(String, unique=True, index=True, nullable=False)  # Lower-cased DOI
+    is_oa = Column(Boolean, index=True, default=False)
+    oa_status = Column(String, nullable=True)
+    journal_issn_l = Column(String, index=True, nullable=True)
+    data = Column(JSON, nullable=False)  # Result dict in the get_unpaywall_data format
+    ingested_at = Column(DateTime, nullable=False)
@@ -0,0 +1,15 @@
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, JSON, Integer, Boolean
+
+from app.db.base_class import Base
+
+
+class UnpaywallRecord(Base):
+    """Cached Unpaywall lookup result, including negative answers (unknown DOI, no OA copy)."""
+    __tablename__ = 'unpaywall_cache'
+    
+    id = Column(Integer, primary_key=True, index=True)
+    doi = Column(String, unique=True, index=True, nullable=False)  # Lower-cased DOI as looked up
+    data = Column(JSON, nullable=False)  # Result dict as returned by get_unpaywall_data
+    is_negative = Column(Boolean, default=False, nullable=False)  # 404/422 or not open access
+    fetched_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
@@ -0,0 +1,187 @@
+"""
+Streaming CSV ingestion and output for the batch DOI finder.
+
+The upload is parsed incrementally from FastAPI's spooled temporary file,
+DOI_BATCH_CHUNK_SIZE rows at a time (file reads run in the threadpool, since
+large uploads are spooled to disk). Each chunk is resolved by the concurrent
+pipeline in doi_service and written out before the next one is read, so peak
+memory is proportional to the chunk size rather than the file size.
+"""
+import codecs
+import csv
+import json
+import logging
+from io import StringIO
+from typing import Any, AsyncIterator, BinaryIO, Dict, Iterator, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.services.doi_service import iter_batch_results
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_COLUMNS = ['title', 'authors', 'year']
+RESULT_COLUMNS = ['doi', 'pdf_url', 'error']
+
+FORMAT_JSON = "json"
+FORMAT_NDJSON = "ndjson"
+FORMAT_CSV = "csv"
+MEDIA_TYPES = {
+    FORMAT_JSON: "application/json",
+    FORMAT_NDJSON: "application/x-ndjson",
+    FORMAT_CSV: "text/csv",
+}
+
+
+def _decoded_lines(binary: BinaryIO) -> Iterator[str]:
+    """Decode a binary file line by line (UTF-8, optional BOM) without reading it all."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    for line in binary:
+        yield decoder.decode(line)
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+class BatchCSVReader:
+    """Incremental reader for an uploaded batch-find-doi CSV."""
+
+    def __init__(self, binary: BinaryIO, chunk_size: Optional[int] = None):
+        self._reader = csv.DictReader(_decoded_lines(binary))
+        self.chunk_size = max(1, chunk_size or settings.DOI_BATCH_CHUNK_SIZE)
+        self.fieldnames: List[str] = []
+        self._error: Optional[Exception] = None
+
+    def read_header(self) -> None:
+        """Read the header row, raising ValueError if required columns are missing."""
+        self.fieldnames = list(self._reader.fieldnames or [])
+        if not all(key in self.fieldnames for key in REQUIRED_COLUMNS):
+            logger.error("CSV must contain 'title', 'authors', and 'year' columns")
+            raise ValueError("CSV must contain 'title', 'authors', and 'year' columns")
+
+    def read_chunk(self) -> List[Dict[str, Any]]:
+        """
+        Read up to chunk_size rows; an empty list means the file is exhausted.
+
+        If a line can't be decoded or parsed, the rows before it are returned
+        and the error is raised by the next call.
+        """
+        if self._error is not None:
+            raise self._error
+        chunk = []
+        try:
+            for row in self._reader:
+                chunk.append(row)
+                if len(chunk) >= self.chunk_size:
+                    break
+        except Exception as e:
+            # A decode error happens before the csv module counts the offending line
+            line = self._reader.line_num + (1 if isinstance(e, UnicodeDecodeError) else 0)
+            error = ValueError(f"Invalid CSV at line {line}: {str(e)}")
+            if not chunk:
+                raise error from e
+            self._error = error
+        return chunk
+
+
+async def open_batch_csv(binary: BinaryIO, chunk_size: Optional[int] = None) -> BatchCSVReader:
+    """Start reading an uploaded CSV and validate its header (ValueError if invalid)."""
+    reader = BatchCSVReader(binary, chunk_size)
+    await run_in_threadpool(reader.read_header)
+    return reader
+
+
+async def iter_chunk_results(reader: BatchCSVReader, ordered: bool = True) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Resolve the CSV chunk by chunk, yielding each chunk's results.
+
+    Args:
+        reader: An opened BatchCSVReader
+        ordered: Yield each chunk once complete and in input order; if False,
+            yield every row as its own list as soon as it finishes
+
+    Each result's 'row' is its 0-based position in the whole file. If the
+    pipeline fails part-way through an ordered chunk, the rows already
+    resolved are yielded before the error is raised.
+    """
+    offset = 0
+    while True:
+        chunk = await run_in_threadpool(reader.read_chunk)
+        if not chunk:
+            return
+        results: List[Optional[Dict[str, Any]]] = [None] * len(chunk)
+        try:
+            async for paper in iter_batch_results(chunk):
+                index = paper['row']
+                paper['row'] = offset + index
+                if ordered:
+                    results[index] = paper
+                else:
+                    yield [paper]
+        except Exception:
+            if ordered:
+                yield [paper for paper in results if paper is not None]
+            raise
+        if ordered:
+            yield results
+        offset += len(chunk)
+
+
+async def stream_batch_results(reader: BatchCSVReader, fmt: str = FORMAT_JSON) -> AsyncIterator[str]:
+    """
+    Render batch results incrementally as a JSON array, NDJSON or CSV.
+
+    JSON and CSV rows come out in input order, one chunk at a time, without
+    the 'row' field; NDJSON rows come out as they finish and keep 'row'.
+    The status code has already been sent when a failure happens mid-stream
+    (e.g. an undecodable line), so rows resolved so far are written out and
+    the failure is reported in-band as a final {"error": ...} record (an
+    error-only row in CSV output).
+    """
+    buffer = StringIO()
+    if fmt == FORMAT_CSV:
+        columns = reader.fieldnames + [c for c in RESULT_COLUMNS if c not in reader.fieldnames]
+        writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+        writer.writeheader()
+
+    def flush_csv() -> str:
+        text = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return text
+
+    if fmt == FORMAT_CSV:
+        yield flush_csv()
+    elif fmt == FORMAT_JSON:
+        yield "["
+
+    first = True
+    try:
+        async for results in iter_chunk_results(reader, ordered=fmt != FORMAT_NDJSON):
+            if not results:
+                continue
+            if fmt == FORMAT_NDJSON:
+                yield "".join(json.dumps(paper) + "\n" for paper in results)
+                continue
+            for paper in results:
+                paper.pop('row', None)
+            if fmt == FORMAT_CSV:
+                writer.writerows(results)
+                yield flush_csv()
+            else:
+                yield ("" if first else ",") + ",".join(json.dumps(paper) for paper in results)
+            first = False
+    except Exception as e:
+        logger.error(f"Error streaming batch DOI results: {str(e)}")
+        error = {"error": f"Error processing CSV file: {str(e)}"}
+        if fmt == FORMAT_NDJSON:
+            yield json.dumps(error) + "\n"
+        elif fmt == FORMAT_CSV:
+            writer.writerow(error)
+            yield flush_csv()
+        else:
+            yield ("" if first else ",") + json.dumps(error)
+
+    if fmt == FORMAT_JSON:
+        yield "]"
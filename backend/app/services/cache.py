@@ -0,0 +1,135 @@
+"""
+In-process response caching for external API calls.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncTTLCache:
+    """
+    Size-bounded LRU cache with a per-entry TTL and stale-while-revalidate.
+
+    Entries younger than `ttl` are served directly. Entries older than `ttl`
+    but younger than `ttl + stale_ttl` are served immediately while a single
+    background task refreshes them. Anything older is fetched inline.
+    """
+
+    def __init__(self, name: str, max_entries: int, ttl: float, stale_ttl: float = 0.0):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._refreshing: Set[Hashable] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refresh_errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    def get(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        """Return (value, age in seconds) for a cached key, or None. Does not touch the counters."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, stored_at = entry
+        return value, time.monotonic() - stored_at
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if not self.enabled:
+            return
+        self._entries[key] = (value, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def get_or_fetch(
+        self,
+        key: Hashable,
+        fetch: Callable[[], Awaitable[Any]],
+        cacheable: Optional[Callable[[Any], bool]] = None
+    ) -> Any:
+        """
+        Return the cached value for key, fetching (and caching) it when missing or expired.
+
+        Args:
+            key: Hashable cache key
+            fetch: Zero-argument coroutine function producing the value
+            cacheable: Optional predicate; values it rejects (e.g. error results) are not stored
+        """
+        if not self.enabled:
+            return await fetch()
+
+        cached = self.get(key)
+        if cached is not None:
+            value, age = cached
+            if age < self.ttl:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return value
+            if age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self._entries.move_to_end(key)
+                self._schedule_refresh(key, fetch, cacheable)
+                return value
+
+        self.misses += 1
+        value = await fetch()
+        if cacheable is None or cacheable(value):
+            self.set(key, value)
+        return value
+
+    def _schedule_refresh(
+        self,
+        key: Hashable,
+        fetch: Callable[[], Awaitable[Any]],
+        cacheable: Optional[Callable[[Any], bool]]
+    ) -> None:
+        """Refresh a stale entry in the background, at most once per key at a time."""
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+
+        async def refresh() -> None:
+            try:
+                value = await fetch()
+                if cacheable is None or cacheable(value):
+                    self.set(key, value)
+            except Exception as e:
+                self.refresh_errors += 1
+                logger.warning(f"Background refresh failed in cache '{self.name}': {str(e)}")
+            finally:
+                self._refreshing.discard(key)
+
+        task = asyncio.create_task(refresh())
+        # Keep a reference so the task isn't garbage collected mid-flight
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and occupancy, for tuning size and TTLs."""
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "name": self.name,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "stale_ttl_seconds": self.stale_ttl,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refresh_errors": self.refresh_errors,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+        }
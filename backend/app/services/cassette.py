@@ -0,0 +1,108 @@
+"""
+Record/replay of upstream HTTP traffic for offline benchmarking.
+
+With HTTP_CASSETTE_MODE="record", every response the shared clients receive
+from OpenAlex/Unpaywall is appended to a JSON-lines cassette (one file per
+upstream in HTTP_CASSETTE_DIR). With "replay", requests are answered from the
+cassette without touching the network, so batch DOI, upload and search paths
+can be load-tested deterministically. See mock_server.py for a synthetic
+stand-in when no recording is available.
+"""
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+CASSETTE_OFF = "off"
+CASSETTE_RECORD = "record"
+CASSETTE_REPLAY = "replay"
+
+# Query parameters that identify the caller rather than the request
+_IGNORED_PARAMS = {"mailto", "email", "api_key"}
+# Response headers worth keeping (the client logic reads these)
+_KEPT_HEADERS = {"content-type", "retry-after"}
+
+
+def request_key(request: httpx.Request) -> str:
+    """Stable key for a request: method, path and sorted query minus caller identity."""
+    params = sorted(
+        (k, v) for k, v in request.url.params.multi_items() if k not in _IGNORED_PARAMS
+    )
+    query = "&".join(f"{k}={v}" for k, v in params)
+    return f"{request.method} {request.url.path}?{query}"
+
+
+class CassetteTransport(httpx.AsyncBaseTransport):
+    """
+    Transport wrapper that records responses to, or replays them from, a cassette file.
+
+    Replay serves recorded responses for a key in order and then keeps repeating
+    the last one, so a benchmark can issue the same request any number of times.
+    A request with no recording fails with httpx.ConnectError, like an unreachable host.
+    """
+
+    def __init__(self, path: str, mode: str, inner: Optional[httpx.AsyncBaseTransport] = None):
+        if mode not in (CASSETTE_RECORD, CASSETTE_REPLAY):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.inner = inner
+        self._recorded: Dict[str, List[Tuple[int, Dict[str, str], str]]] = {}
+        self._replayed: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        if mode == CASSETTE_REPLAY:
+            self._load()
+        else:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            logger.warning(f"Cassette {self.path} not found; every request will miss")
+            return
+        with open(self.path, "r", encoding="utf-8") as fh:
+            for line in fh:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                self._recorded.setdefault(entry["key"], []).append(
+                    (entry["status"], entry["headers"], entry["body"])
+                )
+        logger.info(f"Loaded {sum(len(v) for v in self._recorded.values())} recorded responses from {self.path}")
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = request_key(request)
+        if self.mode == CASSETTE_REPLAY:
+            return self._replay(key, request)
+
+        response = await self.inner.handle_async_request(request)
+        body = await response.aread()
+        headers = {k: v for k, v in response.headers.items() if k.lower() in _KEPT_HEADERS}
+        with open(self.path, "a", encoding="utf-8") as fh:
+            fh.write(json.dumps({
+                "key": key,
+                "status": response.status_code,
+                "headers": headers,
+                "body": body.decode("utf-8", errors="replace"),
+            }) + "\n")
+        await response.aclose()
+        return httpx.Response(response.status_code, headers=headers, content=body, request=request)
+
+    def _replay(self, key: str, request: httpx.Request) -> httpx.Response:
+        entries = self._recorded.get(key)
+        if not entries:
+            self.misses += 1
+            raise httpx.ConnectError(f"No recorded response for {key}", request=request)
+        self.hits += 1
+        index = self._replayed.get(key, 0)
+        self._replayed[key] = index + 1
+        status, headers, body = entries[min(index, len(entries) - 1)]
+        return httpx.Response(status, headers=headers, content=body.encode("utf-8"), request=request)
+
+    async def aclose(self) -> None:
+        if self.inner is not None:
+            await self.inner.aclose()
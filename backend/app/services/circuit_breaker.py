@@ -0,0 +1,109 @@
+"""
+Per-host circuit breakers for external scholarly APIs.
+
+After CIRCUIT_BREAKER_FAILURE_THRESHOLD consecutive failures (5xx, timeouts,
+connection errors) a host's breaker opens and calls to it fail fast instead
+of waiting through retries and backoff. After CIRCUIT_BREAKER_RECOVERY_TIMEOUT
+seconds it goes half-open and lets a single probe request through: success
+closes it again, failure re-opens it. Callers serve cached or stored data
+while a breaker is open where they have any.
+"""
+import logging
+import time
+from typing import Any, Dict
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one upstream host."""
+
+    def __init__(self, name: str, failure_threshold: int, recovery_timeout: float):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_timeout = recovery_timeout
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = HALF_OPEN
+            self._probe_started = 0.0
+            logger.info(f"Circuit breaker '{self.name}' half-open; allowing a probe request")
+        return self._state
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == OPEN
+
+    def allow(self) -> bool:
+        """Whether a call may go to the upstream now. Rejected calls should fail fast."""
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN:
+            now = time.monotonic()
+            # One probe at a time; a probe that never reported back is replaced after the recovery timeout
+            if not self._probe_started or now - self._probe_started >= self.recovery_timeout:
+                self._probe_started = now
+                return True
+        self.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        if self._state != CLOSED:
+            logger.info(f"Circuit breaker '{self.name}' closed")
+        self._state = CLOSED
+        self._failures = 0
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold):
+            self._state = OPEN
+            self._opened_at = time.monotonic()
+            self.times_opened += 1
+            logger.warning(f"Circuit breaker '{self.name}' opened after {self._failures} consecutive failures; "
+                           f"failing fast for {self.recovery_timeout:.0f}s")
+
+    def stats(self) -> Dict[str, Any]:
+        state = self.state
+        return {
+            "name": self.name,
+            "state": state,
+            "consecutive_failures": self._failures,
+            "times_opened": self.times_opened,
+            "rejected_calls": self.rejected,
+            "retry_in_seconds": round(max(0.0, self.recovery_timeout - (time.monotonic() - self._opened_at)), 3)
+            if state == OPEN else 0.0,
+        }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Return the shared breaker for an upstream host, creating it on first use."""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = CircuitBreaker(
+            name,
+            failure_threshold=settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+            recovery_timeout=settings.CIRCUIT_BREAKER_RECOVERY_TIMEOUT,
+        )
+        _breakers[name] = breaker
+    return breaker
+
+
+def breaker_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: breaker.stats() for name, breaker in _breakers.items()}
@@ -2,11 +2,12 @@ import re
 import httpx
 import logging
 import asyncio
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, AsyncIterable, AsyncIterator, Iterable, List, Tuple, Union
 
 from app.core.config import settings
 # Updated import to use the consolidated direct client
-from app.services.openalex_direct import search_papers_direct 
+from app.services.openalex_direct import search_papers_direct, normalize_doi
+from app.services.title_matching import best_match, normalize_title
 
 logger = logging.getLogger(__name__)
 
@@ -18,67 +19,45 @@ def clean_author(author_string: str) -> str:
     return authors[-1] if authors else ""
 
 
-async def get_doi_for_paper(title: str, author: str, year: str) -> Optional[str]:
-    """Find DOI for a paper based on title, author, and year using OpenAlex"""
+async def find_paper_match(title: str, author: str, year: str) -> Optional[Dict[str, Any]]:
+    """
+    Find the best matching OpenAlex paper (with a DOI) for a title, author and year.
+    
+    Fetches DOI_MATCH_CANDIDATES candidates from one search (publication year
+    +/- 1, since online-first and issue years often differ) and scores them all
+    with the fuzzy title/author/year matcher (see title_matching).
+    
+    Returns:
+        The matching paper dict, or None if no candidate reaches DOI_MATCH_THRESHOLD
+    """
     # Clean author if it's a full string
     if len(author.split()) > 1:
         author = clean_author(author)
     
+    try:
+        year_int = int(year) if year else None
+    except ValueError:
+        year_int = None
+    
     try:
         # Use the consolidated direct search function
         results, total_count = await search_papers_direct(
-            query=title,
-            per_page=3, # Use per_page instead of limit
-            page=1,     # Start from page 1
-            year_from=int(year) if year else None, # Ensure year is int
-            year_to=int(year) if year else None,   # Ensure year is int
-            # Removed duplicate year_to=year,
+            query=normalize_title(title) or title,
+            per_page=settings.DOI_MATCH_CANDIDATES,
+            page=1,
+            year_from=year_int - 1 if year_int else None,
+            year_to=year_int + 1 if year_int else None,
             author=author,
-            sort="relevance"
+            sort="relevance",
+            include_abstract=False  # Matching only needs titles, authors and dates
         )
         
-        if results and total_count > 0:
-            # Enhanced matching - prioritize papers with exact title match
-            best_match = None
-            best_match_score = 0
-            
-            for paper in results:
-                # Skip items without DOIs
-                if not paper.get('doi'):
-                    continue
-                    
-                # Basic score starts at 1
-                score = 1
-                
-                # Give higher score for title similarity
-                paper_title = paper.get('title', '').lower()
-                search_title = title.lower()
-                if paper_title == search_title:
-                    score += 3  # Exact match
-                elif search_title in paper_title or paper_title in search_title:
-                    score += 2  # Partial match
-                    
-                # Give bonus points for matching author
-                if author:
-                    has_author = False
-                    for paper_author in paper.get('authors', []):
-                        author_name = paper_author.get('name', '').lower()
-                        if author.lower() in author_name or author_name in author.lower():
-                            has_author = True
-                            break
-                    if has_author:
-                        score += 1
-                        
-                # Update best match if this is better
-                if score > best_match_score:
-                    best_match = paper
-                    best_match_score = score
-            
-            # Use the best matching paper
-            if best_match and 'doi' in best_match:
-                logger.info(f"Found DOI for paper: {title} with match score {best_match_score}")
-                return best_match['doi']
-                
+        match = best_match(title, results, author, year_int) if results else None
+        if match:
+            score, paper = match
+            logger.info(f"Found DOI for paper: {title} with match score {score:.2f}")
+            return paper
+        
         logger.warning(f"No DOI found for: {title} by {author} ({year})")
         return None
     
@@ -87,30 +66,136 @@ async def get_doi_for_paper(title: str, author: str, year: str) -> Optional[str]
         return None
 
 
-async def get_dois_for_papers(papers: List[Dict[str, str]]) -> List[Dict[str, str]]:
-    """Find DOIs for multiple papers using OpenAlex"""
-    result = []
+async def _resolve_row(index: int, paper: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """Find the DOI for one CSV row; returns the row and its matching OpenAlex paper (None if not found)"""
+    title = paper.get('title', '')
+    authors = paper.get('authors', '')
+    year = paper.get('year', '')
     
-    for paper in papers:
-        title = paper.get('title', '')
-        authors = paper.get('authors', '')
-        year = paper.get('year', '')
-        
-        # Skip if missing essential information
-        if not title or not authors or not year:
-            paper['doi'] = None
-            result.append(paper)
-            continue
-        
-        # Extract first author's last name
-        author = clean_author(authors)
-        
-        # Get DOI
-        doi = await get_doi_for_paper(title, author, year)
-        paper['doi'] = doi
-        result.append(paper)
-        
-        # Add a small delay to avoid rate limiting
-        await asyncio.sleep(0.5)
+    match = None
+    # Skip lookup if missing essential information
+    if title and authors and year:
+        match = await find_paper_match(title, clean_author(authors), year)
+    paper['doi'] = match['doi'] if match else None
+    paper['row'] = index
+    return paper, match
+
+
+async def _fill_pdf_urls(matched: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> None:
+    """
+    Set 'pdf_url' on matched rows with one bulk lookup (see get_paper_pdf_urls).
     
-    return result
+    The search hits are the OpenAlex records, so only DOIs without an OA URL
+    there go to Unpaywall, in bulk (get_unpaywall_data_many).
+    """
+    # Imported here: pdf_service is only needed by the batch pipeline
+    from app.services.pdf_service import get_paper_pdf_urls
+    
+    hits = {normalize_doi(match['doi']): match for _, match in matched}
+    try:
+        pdf_urls = await get_paper_pdf_urls(list(hits), openalex_papers=hits)
+    except Exception as e:
+        logger.error(f"Error resolving PDF URLs for {len(hits)} batch rows: {str(e)}")
+        pdf_urls = {}
+        for row, _ in matched:
+            row['error'] = str(e)
+    for row, match in matched:
+        row['pdf_url'] = pdf_urls.get(normalize_doi(match['doi'])) or "Not found"
+
+
+class _FeedError:
+    """Wraps an exception raised while reading batch input, posted to the results queue."""
+    __slots__ = ("error",)
+    
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+async def iter_batch_results(
+    papers: Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]],
+    concurrency: Optional[int] = None,
+    find_pdf: bool = True
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Resolve DOIs (and then OA PDF URLs) for many CSV rows concurrently.
+    
+    Rows are processed by a fixed pool of `concurrency` workers (default
+    DOI_BATCH_CONCURRENCY); all of them share the OpenAlex and Unpaywall rate
+    limiters, so throughput is set by the API quotas. Each row is yielded as
+    soon as it is finished, in completion order, with its 0-based input
+    position in 'row'. Input may be an async iterable and is only read as fast
+    as the workers consume it.
+    
+    With find_pdf, rows with a DOI are held back until every row has been
+    matched, then their PDF URLs are resolved in one bulk pass (see
+    _fill_pdf_urls). Large inputs should therefore be passed in chunks, as
+    batch_csv does.
+    
+    Args:
+        papers: Row dicts with 'title', 'authors' and 'year'
+        concurrency: Maximum rows in flight
+        find_pdf: Also resolve 'pdf_url' ("Not found" / "No DOI" when unavailable)
+    """
+    workers_count = max(1, concurrency or settings.DOI_BATCH_CONCURRENCY)
+    inbox: asyncio.Queue = asyncio.Queue(maxsize=workers_count * 2)
+    outbox: asyncio.Queue = asyncio.Queue()
+    done_marker = object()
+    matched: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+    
+    async def feed() -> None:
+        try:
+            index = 0
+            if hasattr(papers, "__aiter__"):
+                async for paper in papers:
+                    await inbox.put((index, paper))
+                    index += 1
+            else:
+                for paper in papers:
+                    await inbox.put((index, paper))
+                    index += 1
+        except Exception as e:
+            # Surface input errors (e.g. a malformed upload) to the consumer instead of hanging it
+            await outbox.put(_FeedError(e))
+            return
+        for _ in range(workers_count):
+            await inbox.put(done_marker)
+    
+    async def worker() -> None:
+        while True:
+            item = await inbox.get()
+            if item is done_marker:
+                await outbox.put(done_marker)
+                return
+            index, paper = item
+            try:
+                result, match = await _resolve_row(index, paper)
+            except Exception as e:
+                logger.error(f"Error resolving batch row {index}: {str(e)}")
+                result, match = {**paper, 'doi': None, 'row': index, 'error': str(e)}, None
+            if find_pdf:
+                if match is not None:
+                    matched.append((result, match))
+                    continue
+                result['pdf_url'] = "No DOI"
+            await outbox.put(result)
+    
+    feeder = asyncio.create_task(feed())
+    workers = [asyncio.create_task(worker()) for _ in range(workers_count)]
+    try:
+        finished = 0
+        while finished < workers_count:
+            result = await outbox.get()
+            if result is done_marker:
+                finished += 1
+            elif isinstance(result, _FeedError):
+                raise result.error
+            else:
+                yield result
+        if matched:
+            await _fill_pdf_urls(matched)
+            for result, _ in matched:
+                yield result
+    finally:
+        for task in [feeder, *workers]:
+            task.cancel()
+
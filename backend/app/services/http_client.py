@@ -0,0 +1,104 @@
+"""
+Shared, pooled HTTP clients for external scholarly APIs.
+
+One long-lived httpx.AsyncClient is kept per upstream host so that repeated
+OpenAlex/Unpaywall calls reuse pooled keep-alive (and, when available, HTTP/2)
+connections instead of paying a fresh TCP+TLS handshake on every request.
+Clients are opened on application startup and closed on shutdown (see main.py);
+they are also created lazily so scripts outside the app lifespan can use them.
+"""
+import logging
+import os
+import httpx
+from typing import Dict
+
+from app.core.config import settings
+from app.services.cassette import CassetteTransport, CASSETTE_OFF, CASSETTE_REPLAY
+
+logger = logging.getLogger(__name__)
+
+OPENALEX = "openalex"
+UNPAYWALL = "unpaywall"
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+
+def _http2_available() -> bool:
+    """HTTP/2 support in httpx needs the optional 'h2' package."""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _base_url(name: str) -> str:
+    if name == OPENALEX:
+        return settings.OPENALEX_BASE_URL
+    if name == UNPAYWALL:
+        return settings.UNPAYWALL_BASE_URL
+    raise ValueError(f"Unknown upstream client: {name}")
+
+
+def _build_client(name: str) -> httpx.AsyncClient:
+    """Create a pooled client for one upstream host using the configured limits."""
+    limits = httpx.Limits(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+    )
+    # Read timeouts are set per call; this is the fallback for anything that doesn't
+    timeout = httpx.Timeout(settings.OPENALEX_SEARCH_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT)
+
+    http2 = settings.HTTP2_ENABLED and _http2_available()
+    if settings.HTTP2_ENABLED and not http2:
+        logger.warning("HTTP/2 requested but the 'h2' package is not installed; using HTTP/1.1 keep-alive")
+
+    transport: httpx.AsyncBaseTransport = httpx.AsyncHTTPTransport(limits=limits, http2=http2)
+    if settings.HTTP_CASSETTE_MODE != CASSETTE_OFF:
+        cassette = os.path.join(settings.HTTP_CASSETTE_DIR, f"{name}.jsonl")
+        logger.info(f"HTTP client '{name}' using cassette {cassette} ({settings.HTTP_CASSETTE_MODE})")
+        inner = None if settings.HTTP_CASSETTE_MODE == CASSETTE_REPLAY else transport
+        transport = CassetteTransport(cassette, settings.HTTP_CASSETTE_MODE, inner)
+
+    return httpx.AsyncClient(
+        base_url=_base_url(name),
+        transport=transport,
+        timeout=timeout,
+        follow_redirects=True,
+    )
+
+
+def get_client(name: str) -> httpx.AsyncClient:
+    """Return the shared client for an upstream, creating it on first use."""
+    client = _clients.get(name)
+    if client is None or client.is_closed:
+        client = _build_client(name)
+        _clients[name] = client
+    return client
+
+
+def get_openalex_client() -> httpx.AsyncClient:
+    return get_client(OPENALEX)
+
+
+def get_unpaywall_client() -> httpx.AsyncClient:
+    return get_client(UNPAYWALL)
+
+
+def init_http_clients() -> None:
+    """Open the shared clients up front (called on application startup)."""
+    for name in (OPENALEX, UNPAYWALL):
+        get_client(name)
+    logger.info("Shared HTTP clients initialised")
+
+
+async def close_http_clients() -> None:
+    """Close all shared clients and their pooled connections (called on shutdown)."""
+    for name, client in list(_clients.items()):
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.error(f"Error closing HTTP client '{name}': {e}")
+    _clients.clear()
+    logger.info("Shared HTTP clients closed")
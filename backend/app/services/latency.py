@@ -0,0 +1,153 @@
+"""
+Per-endpoint latency tracking, adaptive timeouts and hedged requests.
+
+Each kind of upstream call (OpenAlex search, DOI lookup, Unpaywall, ...) keeps
+a sliding window of observed latencies. Once enough samples exist, the read
+timeout for that endpoint becomes a multiple of the observed p99 (capped by the
+fixed timeout from settings), so a stuck response is abandoned and retried
+quickly instead of stalling a whole batch. Optionally, a duplicate "hedge"
+request is sent once the first has taken longer than p95, and whichever reply
+arrives first wins.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Endpoint types tracked separately (their latency profiles differ widely)
+OPENALEX_SEARCH = "openalex_search"
+OPENALEX_LOOKUP = "openalex_lookup"
+OPENALEX_BATCH = "openalex_batch"
+OPENALEX_FACETS = "openalex_facets"
+OPENALEX_AUTOCOMPLETE = "openalex_autocomplete"
+UNPAYWALL_LOOKUP = "unpaywall_lookup"
+
+
+class LatencyTracker:
+    """Sliding window of recent latencies for one endpoint type."""
+
+    def __init__(self, name: str, window: int):
+        self.name = name
+        self._samples: Deque[float] = deque(maxlen=window)
+        self.hedges_sent = 0
+        self.hedges_won = 0
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Latency at quantile q (0-1), or None until LATENCY_MIN_SAMPLES have been observed."""
+        if len(self._samples) < max(1, settings.LATENCY_MIN_SAMPLES):
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def timeout(self, default: float) -> float:
+        """Read timeout for the next call: p99 x ADAPTIVE_TIMEOUT_MULTIPLIER, within [ADAPTIVE_TIMEOUT_MIN, default]."""
+        if not settings.ADAPTIVE_TIMEOUTS_ENABLED:
+            return default
+        p99 = self.percentile(0.99)
+        if p99 is None:
+            return default
+        return min(default, max(settings.ADAPTIVE_TIMEOUT_MIN, p99 * settings.ADAPTIVE_TIMEOUT_MULTIPLIER))
+
+    def hedge_delay(self) -> Optional[float]:
+        """How long to wait before hedging (observed p95), or None if hedging is off or not yet calibrated."""
+        if not settings.HEDGED_REQUESTS_ENABLED:
+            return None
+        return self.percentile(0.95)
+
+    def stats(self) -> Dict[str, Any]:
+        def rounded(value: Optional[float]) -> Optional[float]:
+            return round(value, 4) if value is not None else None
+
+        return {
+            "name": self.name,
+            "samples": len(self._samples),
+            "p50_seconds": rounded(self.percentile(0.5)),
+            "p95_seconds": rounded(self.percentile(0.95)),
+            "p99_seconds": rounded(self.percentile(0.99)),
+            "hedges_sent": self.hedges_sent,
+            "hedges_won": self.hedges_won,
+        }
+
+
+_trackers: Dict[str, LatencyTracker] = {}
+
+
+def get_tracker(name: str) -> LatencyTracker:
+    """Return the shared tracker for an endpoint type, creating it on first use."""
+    tracker = _trackers.get(name)
+    if tracker is None:
+        tracker = LatencyTracker(name, settings.LATENCY_WINDOW)
+        _trackers[name] = tracker
+    return tracker
+
+
+def latency_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: tracker.stats() for name, tracker in _trackers.items()}
+
+
+async def timed_call(tracker: LatencyTracker, timeout: float, fn: Callable[[float], Awaitable[Any]]) -> Any:
+    """
+    Run fn(timeout) and record how long it took.
+
+    Timeouts are recorded at the full timeout value, so a slow spell pushes
+    the p99 (and with it the adaptive timeout) back up.
+    """
+    start = time.monotonic()
+    try:
+        result = await fn(timeout)
+    except (asyncio.TimeoutError, httpx.TimeoutException):
+        tracker.observe(timeout)
+        raise
+    tracker.observe(time.monotonic() - start)
+    return result
+
+
+async def hedged(tracker: LatencyTracker, fn: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Run fn, sending a second identical call if the first is slower than p95.
+
+    The first call to finish successfully wins and the other is cancelled. If
+    one call fails, the other is still awaited; only when both fail is the
+    last error raised. Without a calibrated p95 this is just `await fn()`.
+    """
+    delay = tracker.hedge_delay()
+    if delay is None:
+        return await fn()
+
+    primary = asyncio.ensure_future(fn())
+    tasks = [primary]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done:
+            return primary.result()
+
+        tracker.hedges_sent += 1
+        logger.debug(f"Hedging '{tracker.name}' request after {delay:.3f}s")
+        hedge = asyncio.ensure_future(fn())
+        tasks.append(hedge)
+        pending = set(tasks)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is hedge:
+                        tracker.hedges_won += 1
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        # Cancel the losing (or, if we were cancelled, every) call
+        for task in tasks:
+            if not task.done():
+                task.cancel()
@@ -0,0 +1,307 @@
+"""
+Local OpenAlex search index built from offline snapshot files.
+
+Works are streamed from the OpenAlex snapshot (`*.gz` JSON-lines files),
+optionally filtered by concept or source, and bulk-inserted into the
+openalex_local_work table plus an SQLite FTS5 table over title, abstract and
+author names. With OPENALEX_LOCAL_MODE set to "prefer" or "only", searches
+and DOI lookups in openalex_direct are answered from this index without
+going to the network.
+"""
+import glob
+import gzip
+import logging
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from app.db.bulk import insert_or_replace, select_in
+from app.db.session import engine as default_engine
+from app.models.local_work import LocalWork
+from app.services.openalex_records import WorkRecord, decode_json
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "openalex_local_work_fts"
+
+LOCAL_MODE_OFF = "off"
+LOCAL_MODE_PREFER = "prefer"  # Use the local index when it has an answer, otherwise the API
+LOCAL_MODE_ONLY = "only"  # Never go to the network for searches and DOI lookups
+
+
+def _is_sqlite(engine: Engine) -> bool:
+    return engine.dialect.name == "sqlite"
+
+
+def init_local_index(engine: Engine = default_engine) -> None:
+    """Create the local work table and (on SQLite) its FTS5 full-text table."""
+    LocalWork.__table__.create(bind=engine, checkfirst=True)
+    if _is_sqlite(engine):
+        with engine.begin() as conn:
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(title, abstract, authors)"
+            ))
+
+
+def _short_id(openalex_id: Optional[str]) -> Optional[str]:
+    """'https://openalex.org/C123' -> 'C123'."""
+    if not openalex_id:
+        return None
+    return openalex_id.rstrip("/").rsplit("/", 1)[-1].upper()
+
+
+# --- Snapshot ingestion ---
+def iter_snapshot_lines(path: str) -> Iterator[bytes]:
+    """
+    Stream raw JSON lines from a snapshot file or directory.
+
+    A directory is searched recursively for `*.gz` files (the snapshot's
+    `data/works/updated_date=*/part_*.gz` layout); files are read one line at a time.
+    """
+    if os.path.isdir(path):
+        files = sorted(glob.glob(os.path.join(path, "**", "*.gz"), recursive=True))
+    else:
+        files = [path]
+
+    for file_path in files:
+        logger.info(f"Reading snapshot file {file_path}")
+        opener = gzip.open if file_path.endswith(".gz") else open
+        with opener(file_path, "rb") as fh:
+            for line in fh:
+                if line.strip():
+                    yield line
+
+
+def _matches(work: Dict[str, Any], concept_ids: Optional[set], source_ids: Optional[set]) -> bool:
+    if concept_ids is not None:
+        work_concepts = {_short_id(c.get("id")) for c in work.get("concepts") or ()}
+        if not work_concepts & concept_ids:
+            return False
+    if source_ids is not None:
+        source = (work.get("primary_location") or {}).get("source") or {}
+        if _short_id(source.get("id")) not in source_ids:
+            return False
+    return True
+
+
+def _flush(conn, rows: List[Dict[str, Any]], fts_rows: List[Dict[str, Any]], sqlite: bool) -> None:
+    # Re-ingesting a newer snapshot replaces works in place
+    insert_or_replace(conn, LocalWork.__table__, rows)
+    if sqlite:
+        conn.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :rowid"), [{"rowid": r["rowid"]} for r in fts_rows])
+        conn.execute(
+            text(f"INSERT INTO {FTS_TABLE}(rowid, title, abstract, authors) VALUES (:rowid, :title, :abstract, :authors)"),
+            fts_rows
+        )
+
+
+def ingest_snapshot(
+    path: str,
+    concept_ids: Optional[Iterable[str]] = None,
+    source_ids: Optional[Iterable[str]] = None,
+    batch_size: int = 1000,
+    engine: Engine = default_engine
+) -> Dict[str, int]:
+    """
+    Stream an OpenAlex works snapshot into the local index.
+
+    Memory use is bounded by batch_size: lines are decoded one at a time and
+    rows are bulk-inserted (one transaction per batch) as soon as a batch fills.
+
+    Args:
+        path: A snapshot `.gz` file or a directory containing them
+        concept_ids: Only keep works tagged with one of these concepts (e.g. "C71924100")
+        source_ids: Only keep works whose primary source is one of these (e.g. "S137773608")
+        batch_size: Rows per bulk insert
+
+    Returns:
+        Counts of lines read, works matched, rows written and lines skipped as invalid
+    """
+    # Imported here to avoid a circular import (openalex_direct consults this module)
+    from app.services.openalex_direct import _format_work, normalize_doi
+
+    concepts = {_short_id(c) for c in concept_ids} if concept_ids else None
+    sources = {_short_id(s) for s in source_ids} if source_ids else None
+    sqlite = _is_sqlite(engine)
+    init_local_index(engine)
+
+    stats = {"read": 0, "matched": 0, "written": 0, "invalid": 0}
+    rows: List[Dict[str, Any]] = []
+    fts_rows: List[Dict[str, Any]] = []
+    now = datetime.utcnow()
+
+    def flush() -> None:
+        if not rows:
+            return
+        with engine.begin() as conn:
+            _flush(conn, rows, fts_rows, sqlite)
+        stats["written"] += len(rows)
+        rows.clear()
+        fts_rows.clear()
+        logger.info(f"Local index ingest: {stats['read']} read, {stats['written']} written")
+
+    for line in iter_snapshot_lines(path):
+        stats["read"] += 1
+        try:
+            work = decode_json(line)
+            short_id = _short_id(work.get("id"))
+            if not short_id or not short_id.startswith("W"):
+                raise ValueError("missing work id")
+            if not _matches(work, concepts, sources):
+                continue
+
+            record = WorkRecord(work)
+            paper = _format_work(record)
+            row_id = int(short_id[1:])
+        except Exception as e:
+            stats["invalid"] += 1
+            logger.debug(f"Skipping invalid snapshot line: {e}")
+            continue
+
+        stats["matched"] += 1
+        source = (work.get("primary_location") or {}).get("source") or {}
+        rows.append({
+            "id": row_id,
+            "openalex_id": record.openalex_id,
+            "doi": normalize_doi(record.doi),
+            "title": record.title,
+            "publication_year": work.get("publication_year"),
+            "publication_date": record.publication_date,
+            "journal": record.journal,
+            "source_id": _short_id(source.get("id")),
+            "is_oa": record.is_oa,
+            "cited_by_count": record.citation_count,
+            "data": paper,
+            "ingested_at": now,
+        })
+        fts_rows.append({
+            "rowid": row_id,
+            "title": record.title,
+            "abstract": paper.get("abstract") or "",
+            # Short author IDs are indexed alongside names so exact author-ID filters work locally
+            "authors": " ".join(
+                [a.name for a in record.authors]
+                + [_short_id((a.get("author") or {}).get("id")) or "" for a in work.get("authorships") or ()]
+            ),
+        })
+        if len(rows) >= batch_size:
+            flush()
+
+    flush()
+    logger.info(f"Local index ingest complete: {stats}")
+    return stats
+
+
+# --- Local lookups ---
+def _fts_phrase(value: str) -> str:
+    """Quote free text as FTS5 terms so user input can't inject query syntax."""
+    terms = [t.replace('"', '') for t in value.split()]
+    return " ".join(f'"{t}"' for t in terms if t)
+
+
+def get_local_works_by_dois(dois: List[str], engine: Engine = default_engine) -> Dict[str, Dict[str, Any]]:
+    """Get formatted works from the local index, keyed by normalized DOI."""
+    if not dois:
+        return {}
+    found: Dict[str, Dict[str, Any]] = {}
+    try:
+        with engine.connect() as conn:
+            for row in select_in(conn, LocalWork.__table__.c.doi, dois):
+                found[row["doi"]] = row["data"]
+    except Exception as e:
+        logger.error(f"Error reading local OpenAlex index: {str(e)}")
+    return found
+
+
+def search_local_works(
+    query: str,
+    page: int = 1,
+    per_page: int = 10,
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    journal: Optional[str] = None,
+    author: Optional[str] = None,
+    open_access_only: bool = False,
+    sort: Optional[str] = None,
+    engine: Engine = default_engine
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Search the local index with the same parameters as search_papers_direct.
+
+    Full-text matching uses FTS5 (ranked by bm25 for relevance sort) on SQLite,
+    and a title substring match on other databases.
+
+    Returns:
+        Tuple of (list of papers, total results count)
+    """
+    # Imported here to avoid a circular import (openalex_direct consults this module)
+    from app.services.openalex_direct import openalex_short_id
+
+    conditions = []
+    params: Dict[str, Any] = {}
+    sqlite = _is_sqlite(engine)
+    source_id = openalex_short_id(journal, "S")
+
+    if sqlite:
+        match = []
+        if query and _fts_phrase(query):
+            match.append("{title abstract}: (" + _fts_phrase(query) + ")")
+        if author and _fts_phrase(author):
+            match.append("authors: (" + _fts_phrase(author) + ")")
+        if not match:
+            return [], 0
+        conditions.append(f"{FTS_TABLE} MATCH :match")
+        params["match"] = " AND ".join(match)
+        from_clause = f"{FTS_TABLE} JOIN openalex_local_work w ON w.id = {FTS_TABLE}.rowid"
+    else:
+        if not query:
+            return [], 0
+        conditions.append("LOWER(w.title) LIKE :query")
+        params["query"] = f"%{query.lower()}%"
+        from_clause = "openalex_local_work w"
+
+    if year_from:
+        conditions.append("w.publication_year >= :year_from")
+        params["year_from"] = year_from
+    if year_to:
+        conditions.append("w.publication_year <= :year_to")
+        params["year_to"] = year_to
+    if source_id:
+        conditions.append("w.source_id = :source_id")
+        params["source_id"] = source_id
+    elif journal and journal.strip():
+        conditions.append("LOWER(w.journal) LIKE :journal")
+        params["journal"] = f"%{journal.strip().lower()}%"
+    if open_access_only:
+        conditions.append("w.is_oa = :is_oa")
+        params["is_oa"] = True
+
+    if sort == "date":
+        order = "w.publication_date DESC"
+    elif sort == "cited":
+        order = "w.cited_by_count DESC"
+    elif sort == "title":
+        order = "w.title ASC"
+    else:
+        order = f"bm25({FTS_TABLE})" if sqlite else "w.cited_by_count DESC"
+
+    where = " AND ".join(conditions)
+    params["limit"] = per_page
+    params["offset"] = max(0, page - 1) * per_page
+
+    try:
+        with engine.connect() as conn:
+            total = conn.execute(text(f"SELECT COUNT(*) FROM {from_clause} WHERE {where}"), params).scalar() or 0
+            rows = conn.execute(
+                text(f"SELECT w.data FROM {from_clause} WHERE {where} ORDER BY {order} LIMIT :limit OFFSET :offset")
+                .columns(data=LocalWork.__table__.c.data.type),
+                params
+            ).scalars().all()
+    except Exception as e:
+        logger.error(f"Error searching local OpenAlex index: {str(e)}")
+        return [], 0
+
+    return list(rows), total
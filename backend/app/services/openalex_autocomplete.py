@@ -0,0 +1,149 @@
+"""
+Typeahead for the journal (source) and author search filters.
+
+Backed by the OpenAlex autocomplete endpoints. Keystrokes are debounced per
+client, identical concurrent lookups share one request, and results are kept
+in an in-process prefix cache: when a shorter prefix already returned its
+complete result set, longer prefixes are answered by filtering it locally.
+The IDs returned here are meant to be passed back as the journal/author
+search parameters, which send an ID as an exact-ID OpenAlex filter instead of
+a free-text match.
+"""
+import asyncio
+import logging
+import re
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.services.cache import AsyncTTLCache
+from app.services.singleflight import SingleFlight
+from app.services.openalex_records import decode_json
+from app.services import latency
+
+logger = logging.getLogger(__name__)
+
+SOURCES = "sources"
+AUTHORS = "authors"
+ENTITIES = (SOURCES, AUTHORS)
+
+# OpenAlex autocomplete returns at most this many matches
+AUTOCOMPLETE_LIMIT = 10
+MIN_QUERY_LENGTH = 2
+
+autocomplete_cache = AsyncTTLCache(
+    "openalex_autocomplete",
+    max_entries=settings.AUTOCOMPLETE_CACHE_MAX_ENTRIES,
+    ttl=settings.AUTOCOMPLETE_CACHE_TTL,
+)
+autocomplete_lookups = SingleFlight("openalex_autocomplete")
+
+
+def _normalize_prefix(q: str) -> str:
+    return " ".join(q.lower().split())
+
+
+def _matches_prefix(display_name: str, prefix: str) -> bool:
+    """Every query token must start a word of the name (how OpenAlex matches typeahead input)."""
+    words = re.findall(r"\w+", display_name.lower())
+    return all(any(word.startswith(token) for word in words) for token in re.findall(r"\w+", prefix))
+
+
+def _from_shorter_prefix(entity: str, prefix: str) -> Optional[List[Dict[str, Any]]]:
+    """Answer from a cached shorter prefix whose result set was complete, if there is one."""
+    for end in range(len(prefix) - 1, MIN_QUERY_LENGTH - 1, -1):
+        cached = autocomplete_cache.get((entity, prefix[:end]))
+        if cached is None:
+            continue
+        results, age = cached
+        if age >= autocomplete_cache.ttl:
+            return None
+        if len(results) < AUTOCOMPLETE_LIMIT:
+            return [r for r in results if _matches_prefix(r["display_name"] or "", prefix)]
+        return None
+    return None
+
+
+def _format_match(match: Dict[str, Any]) -> Dict[str, Any]:
+    openalex_id = match.get("id") or ""
+    return {
+        "id": openalex_id.rsplit("/", 1)[-1],
+        "openalex_id": openalex_id,
+        "display_name": match.get("display_name"),
+        "hint": match.get("hint"),
+        "works_count": match.get("works_count"),
+        "cited_by_count": match.get("cited_by_count"),
+    }
+
+
+async def _fetch_autocomplete(entity: str, prefix: str) -> Optional[List[Dict[str, Any]]]:
+    # Imported here to avoid a circular import (openalex_direct builds the ID filters)
+    from app.services.openalex_direct import _openalex_get, EMAIL
+
+    response = await _openalex_get(
+        f"/autocomplete/{entity}", {"q": prefix, "mailto": EMAIL},
+        timeout=settings.OPENALEX_LOOKUP_TIMEOUT, retry_delay=1, max_retries=2,
+        endpoint=latency.OPENALEX_AUTOCOMPLETE
+    )
+    if response is None or response.status_code != 200:
+        logger.warning(f"OpenAlex autocomplete failed for {entity} '{prefix}'")
+        return None
+    data = decode_json(response.content)
+    return [_format_match(match) for match in data.get("results") or []]
+
+
+async def autocomplete(entity: str, q: str) -> List[Dict[str, Any]]:
+    """
+    Suggest sources or authors for a typed prefix.
+
+    Args:
+        entity: "sources" or "authors"
+        q: The text typed so far
+
+    Returns:
+        Up to AUTOCOMPLETE_LIMIT matches with short OpenAlex IDs (e.g. "S137773608")
+    """
+    if entity not in ENTITIES:
+        raise ValueError(f"Unknown autocomplete entity: {entity}")
+    prefix = _normalize_prefix(q)
+    if len(prefix) < MIN_QUERY_LENGTH:
+        return []
+
+    local = _from_shorter_prefix(entity, prefix)
+    if local is not None:
+        autocomplete_cache.set((entity, prefix), local)
+        return local
+
+    key = (entity, prefix)
+    results = await autocomplete_cache.get_or_fetch(
+        key,
+        lambda: autocomplete_lookups.do(key, lambda: _fetch_autocomplete(entity, prefix)),
+        cacheable=lambda value: value is not None
+    )
+    return results or []
+
+
+class Debouncer:
+    """
+    Server-side keystroke debouncing: each client's request waits briefly and
+    is dropped if the same client sent a newer one meanwhile.
+    """
+
+    def __init__(self):
+        self._latest: Dict[str, int] = {}
+        self._seq = 0
+
+    async def wait(self, client: str, delay: float) -> bool:
+        """Return True if this request is still the client's latest after the delay."""
+        if delay <= 0:
+            return True
+        self._seq += 1
+        seq = self._seq
+        self._latest[client] = seq
+        await asyncio.sleep(delay)
+        if self._latest.get(client) != seq:
+            return False
+        del self._latest[client]
+        return True
+
+
+autocomplete_debouncer = Debouncer()
@@ -2,33 +2,47 @@
 OpenAlex direct API client for academic search.
 """
 import logging
+import re
 import httpx
 import asyncio # Added for potential retries/sleep
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, List, Optional, Tuple, AsyncIterator
 from datetime import datetime
+from starlette.concurrency import run_in_threadpool
 from app.core.config import settings
+from app.services.http_client import get_openalex_client, OPENALEX
+from app.services.rate_limit import get_limiter, parse_retry_after, DailyQuotaExceeded
+from app.services.cache import AsyncTTLCache
+from app.services import work_store, local_index
+from app.services.singleflight import SingleFlight
+from app.services import latency
+from app.services.circuit_breaker import get_breaker
+from app.services.openalex_records import WORK_FIELDS, WorkRecord, decode_json, decode_work, decode_works_page
 
 logger = logging.getLogger(__name__)
 
 # Helper function to reconstruct abstract from inverted index
 def reconstruct_abstract(inverted_index: Optional[Dict[str, List[int]]]) -> Optional[str]:
-    """Reconstructs the abstract string from OpenAlex's inverted index format."""
+    """
+    Reconstructs the abstract string from OpenAlex's inverted index format.
+    
+    Runs in linear time: each word is placed straight into its slot of a
+    preallocated position array instead of sorting (word, position) pairs.
+    """
     if not inverted_index:
         return None
     
     try:
-        # Create a list of (word, position) tuples
-        word_positions = []
+        length = 1 + max((max(positions) for positions in inverted_index.values() if positions), default=-1)
+        if length <= 0:
+            return None
+        
+        words: List[Optional[str]] = [None] * length
         for word, positions in inverted_index.items():
             for pos in positions:
-                word_positions.append((word, pos))
+                words[pos] = word
         
-        # Sort by position
-        word_positions.sort(key=lambda x: x[1])
-        
-        # Join words
-        abstract = ' '.join([word for word, pos in word_positions])
-        return abstract
+        # Skip any gaps left by positions OpenAlex omitted
+        return ' '.join([word for word in words if word is not None])
     except Exception as e:
         logger.error(f"Error reconstructing abstract: {e}")
         return None
@@ -36,6 +50,287 @@ def reconstruct_abstract(inverted_index: Optional[Dict[str, List[int]]]) -> Opti
 # Email for the polite pool - get from settings
 EMAIL = settings.OPENALEX_EMAIL
 
+# Root-level work fields requested in basic mode: the ones WorkRecord reads
+WORK_SELECT_FIELDS = list(WORK_FIELDS)
+
+# Field projection modes: "basic" selects only what the formatter needs; "full"
+# downloads the whole work record and returns the other fields in the paper's "extra" dict
+FIELDS_BASIC = "basic"
+FIELDS_FULL = "full"
+
+# Basic page/per-page paging limits
+MAX_PER_PAGE = 200
+MAX_PAGED_RESULTS = 10000
+
+# Cursor paging allows OpenAlex's maximum page size and has no 10,000-result ceiling
+CURSOR_PAGE_SIZE = 200
+
+# Cache of formatted search pages, keyed on the normalized search parameters
+search_cache = AsyncTTLCache(
+    "openalex_search",
+    max_entries=settings.SEARCH_CACHE_MAX_ENTRIES,
+    ttl=settings.SEARCH_CACHE_TTL,
+    stale_ttl=settings.SEARCH_CACHE_STALE_TTL,
+)
+
+# Cache of group_by facet counts, tuned like the search cache
+facet_cache = AsyncTTLCache(
+    "openalex_facets",
+    max_entries=settings.SEARCH_CACHE_MAX_ENTRIES,
+    ttl=settings.SEARCH_CACHE_TTL,
+    stale_ttl=settings.SEARCH_CACHE_STALE_TTL,
+)
+
+# group_by fields exposed as search facets
+FACET_FIELDS = [
+    "publication_year",
+    "primary_location.source.id",
+    "open_access.is_oa",
+    "type",
+]
+
+# Concurrent lookups of the same DOI share one upstream request
+doi_lookups = SingleFlight("openalex_doi")
+
+# OpenAlex accepts OR-ed filter values ("doi:a|b|c"); keep each batch well below the URL length limit
+DOI_BATCH_SIZE = 50
+
+
+def normalize_doi(doi: Optional[str]) -> Optional[str]:
+    """Normalize a DOI to its lower-case bare form (no resolver prefix), e.g. '10.1038/nature12373'."""
+    if not doi:
+        return None
+    doi = doi.strip().lower()
+    for prefix in ("https://doi.org/", "http://doi.org/", "https://dx.doi.org/", "http://dx.doi.org/", "doi:"):
+        if doi.startswith(prefix):
+            doi = doi[len(prefix):]
+            break
+    return doi.strip() or None
+
+
+def _select_params(fields: str = FIELDS_BASIC, include_abstract: bool = True) -> Dict[str, str]:
+    """Build the "select" query parameter for a field projection mode."""
+    if fields == FIELDS_FULL:
+        return {}
+    select = WORK_SELECT_FIELDS if include_abstract else [
+        f for f in WORK_SELECT_FIELDS if f != "abstract_inverted_index"
+    ]
+    return {"select": ",".join(select)}
+
+
+def _format_work(record: WorkRecord, include_abstract: bool = True) -> Dict[str, Any]:
+    """
+    Format a decoded OpenAlex work record into the paper dict used across the app.
+    
+    The abstract is only reconstructed when asked for; otherwise it is left as None
+    and can be fetched on demand with get_work_abstract.
+    """
+    abstract = reconstruct_abstract(record.abstract_inverted_index) if include_abstract else None
+    return record.to_paper(abstract)
+
+
+def _use_local_index(fields: str) -> bool:
+    """
+    Whether the local OpenAlex index should answer a request.
+    
+    Local records only hold the basic fields, so full-mode requests go to the
+    API unless OPENALEX_LOCAL_MODE is "only".
+    """
+    mode = settings.OPENALEX_LOCAL_MODE
+    return mode == local_index.LOCAL_MODE_ONLY or (mode != local_index.LOCAL_MODE_OFF and fields != FIELDS_FULL)
+
+
+async def _openalex_get(
+    path: str,
+    params: Dict[str, Any],
+    timeout: float,
+    retry_delay: float = 2,
+    max_retries: int = 3,
+    endpoint: str = latency.OPENALEX_SEARCH,
+    hedge: bool = False
+) -> Optional[httpx.Response]:
+    """
+    GET an OpenAlex path on the shared pooled client with retry logic.
+    
+    Every attempt first takes a token from the shared OpenAlex rate limiter.
+    Rate limits (429) pause that limiter for the Retry-After period, so all
+    concurrent callers back off together. Server errors (5xx) and timeouts are
+    retried with exponential backoff. Any other response is returned as-is.
+    
+    Latency is tracked per endpoint type; `timeout` is the ceiling for the
+    adaptive read timeout derived from it. With hedge=True (and hedging
+    enabled), a slow attempt is raced against a duplicate request.
+    
+    Server errors, timeouts and connection errors count against the OpenAlex
+    circuit breaker; while it is open, no request is sent and None is returned
+    immediately.
+    
+    Returns:
+        The final response, or None if every attempt failed
+    """
+    client = get_openalex_client()
+    limiter = get_limiter(OPENALEX)
+    tracker = latency.get_tracker(endpoint)
+    breaker = get_breaker(OPENALEX)
+    
+    async def send() -> httpx.Response:
+        await limiter.acquire()
+        return await latency.timed_call(
+            tracker, tracker.timeout(timeout),
+            lambda attempt_timeout: client.get(path, params=params, timeout=attempt_timeout)
+        )
+    
+    for attempt in range(max_retries):
+        if not breaker.allow():
+            logger.warning(f"OpenAlex circuit breaker open; failing fast for {path}")
+            return None
+        try:
+            response = await (latency.hedged(tracker, send) if hedge else send())
+            
+            # Log the response status
+            logger.info(f"OpenAlex API response status: {response.status_code}")
+            
+            if response.status_code == 429:
+                retry_after = parse_retry_after(response.headers.get("Retry-After"), retry_delay)
+                logger.warning(f"OpenAlex API rate limit hit (attempt {attempt+1}/{max_retries}). Waiting {retry_after}s.")
+                limiter.penalize(retry_after)
+                retry_delay *= 2
+                # The limiter now holds back every caller until Retry-After has passed
+                continue
+            elif response.status_code >= 500:
+                breaker.record_failure()
+                logger.warning(f"OpenAlex API server error {response.status_code} (attempt {attempt+1}/{max_retries}). Retrying.")
+            else:
+                breaker.record_success()
+                return response
+        
+        except DailyQuotaExceeded as e:
+            logger.error(str(e))
+            return None
+        except httpx.TimeoutException:
+            breaker.record_failure()
+            logger.warning(f"OpenAlex API timeout (attempt {attempt+1}/{max_retries}). Retrying.")
+        except httpx.TransportError as e:
+            breaker.record_failure()
+            logger.warning(f"OpenAlex API connection error: {str(e)} (attempt {attempt+1}/{max_retries}). Retrying.")
+        
+        if breaker.is_open:
+            return None
+        if attempt < max_retries - 1:
+            await asyncio.sleep(retry_delay)
+            retry_delay *= 2
+    
+    return None
+
+def openalex_short_id(value: Optional[str], prefix: str) -> Optional[str]:
+    """
+    Return the short OpenAlex ID (e.g. "S137773608") if value is an OpenAlex ID
+    of the given entity prefix ("S" sources, "A" authors), in short or URL form.
+    """
+    if not value or not isinstance(value, str):
+        return None
+    match = re.fullmatch(rf"(?:https?://openalex\.org/)?({prefix}\d+)", value.strip(), re.IGNORECASE)
+    return match.group(1).upper() if match else None
+
+def _build_search_params(
+    query: Optional[str],
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    journal: Optional[str] = None,
+    author: Optional[str] = None,
+    open_access_only: bool = False,
+    sort: Optional[str] = None
+) -> Dict[str, Any]:
+    """Build the search, sort and filter query parameters shared by all /works search requests."""
+    params: Dict[str, Any] = {}
+    
+    # Add search term
+    if query:
+        params["search"] = query
+        
+    # Add sort
+    if sort:
+        if sort == "date":
+            params["sort"] = "publication_date:desc"
+        elif sort == "cited":
+            params["sort"] = "cited_by_count:desc"
+        elif sort == "title":
+            params["sort"] = "title:asc"
+            
+    # Build filters
+    filters = []
+    
+    # Year filters - ensure valid year ranges
+    if year_from and isinstance(year_from, int) and year_from > 0:
+        filters.append(f"publication_year:>{year_from-1}")
+    if year_to and isinstance(year_to, int) and year_to > 0:
+        filters.append(f"publication_year:<{year_to+1}")
+        
+    # Journal filter - an OpenAlex source ID (from /autocomplete/sources) is matched exactly,
+    # anything else as free text; sanitize input
+    source_id = openalex_short_id(journal, "S")
+    if source_id:
+        filters.append(f"primary_location.source.id:{source_id}")
+    elif journal and isinstance(journal, str) and journal.strip():
+        # Remove any characters that might cause issues with the API
+        safe_journal = journal.strip().replace('"', '').replace(':', '')
+        filters.append(f"host_venue.display_name.search:{safe_journal}")
+        
+    # Author filter - likewise exact for an OpenAlex author ID; sanitize input
+    author_id = openalex_short_id(author, "A")
+    if author_id:
+        filters.append(f"authorships.author.id:{author_id}")
+    elif author and isinstance(author, str) and author.strip():
+        # Remove any characters that might cause issues with the API
+        safe_author = author.strip().replace('"', '').replace(':', '')
+        filters.append(f"authorships.author.display_name.search:{safe_author}")
+        
+    # Open access filter
+    if open_access_only:
+        filters.append("is_oa:true")
+        
+    # Add filters to params
+    if filters:
+        params["filter"] = ",".join(filters)
+    
+    return params
+
+def _normalize_text(value: Optional[str]) -> Optional[str]:
+    """Case-fold and collapse whitespace so equivalent free-text inputs share a cache key."""
+    if not value or not isinstance(value, str):
+        return None
+    return " ".join(value.lower().split()) or None
+
+
+def _search_cache_key(
+    query: str,
+    page: int,
+    per_page: int,
+    year_from: Optional[int],
+    year_to: Optional[int],
+    journal: Optional[str],
+    author: Optional[str],
+    open_access_only: bool,
+    sort: Optional[str],
+    fields: str,
+    include_abstract: bool
+) -> Tuple:
+    """Normalized parameter tuple identifying one search page."""
+    return (
+        _normalize_text(query),
+        page,
+        per_page,
+        year_from or None,
+        year_to or None,
+        _normalize_text(journal),
+        _normalize_text(author),
+        bool(open_access_only),
+        # Only these sort options change the request; anything else means relevance
+        sort if sort in ("date", "cited", "title") else None,
+        fields,
+        bool(include_abstract),
+    )
+
 # --- Consolidated Search Function ---
 async def search_papers_direct(
     query: str,
@@ -46,7 +341,9 @@ async def search_papers_direct(
     journal: Optional[str] = None,
     author: Optional[str] = None,
     open_access_only: bool = False,
-    sort: Optional[str] = None
+    sort: Optional[str] = None,
+    fields: str = FIELDS_BASIC,
+    include_abstract: bool = True
 ) -> Tuple[List[Dict[str, Any]], int]:
     """
     Search for papers using OpenAlex API directly
@@ -61,318 +358,582 @@ async def search_papers_direct(
         author: Filter by author name
         open_access_only: Whether to return only open access papers
         sort: Sort order for results
+        fields: "basic" to fetch only the fields the formatter uses, "full" to also
+            return every other field of the work record in the paper's "extra" dict
+        include_abstract: Set False to skip downloading and reconstructing abstracts
+            (e.g. for title-only result lists); fetch them later with get_work_abstract
         
     Returns:
         Tuple of (list of papers, total results count)
     """
+    key = _search_cache_key(
+        query, page, per_page, year_from, year_to, journal, author, open_access_only, sort, fields,
+        include_abstract
+    )
+    
+    async def fetch() -> Tuple[List[Dict[str, Any]], int]:
+        return await _search_papers_uncached(
+            query, page, per_page, year_from, year_to, journal, author, open_access_only, sort, fields,
+            include_abstract
+        )
+    
+    if get_breaker(OPENALEX).is_open:
+        # OpenAlex is failing: serve whatever we have cached, however old, rather than nothing
+        cached = search_cache.get(key)
+        if cached is not None:
+            logger.info(f"Serving cached search for '{query}' while the OpenAlex circuit is open")
+            return cached[0]
+    
+    # Failed searches come back as ([], 0), so empty pages are never cached
+    return await search_cache.get_or_fetch(key, fetch, cacheable=lambda result: bool(result[0]))
+
+async def _search_papers_uncached(
+    query: str,
+    page: int,
+    per_page: int,
+    year_from: Optional[int],
+    year_to: Optional[int],
+    journal: Optional[str],
+    author: Optional[str],
+    open_access_only: bool,
+    sort: Optional[str],
+    fields: str,
+    include_abstract: bool
+) -> Tuple[List[Dict[str, Any]], int]:
+    """Run a search against OpenAlex, bypassing the search cache."""
+    if _use_local_index(fields):
+        results, total = await run_in_threadpool(
+            local_index.search_local_works,
+            query, page, per_page, year_from, year_to, journal, author, open_access_only, sort
+        )
+        if results or settings.OPENALEX_LOCAL_MODE == local_index.LOCAL_MODE_ONLY:
+            logger.info(f"Local index search for '{query}': {total} results")
+            if not include_abstract:
+                results = [{**paper, "abstract": None} for paper in results]
+            return results, total
+    
     try:
         # Build the API URL
-        base_url = "https://api.openalex.org/works"
+        base_url = "/works"
         
         # Build parameters
         params = {
             "per-page": per_page,
             "page": page,
-            "mailto": EMAIL
+            "mailto": EMAIL,
+            **_select_params(fields, include_abstract)
         }
         
-        # Add search term
-        if query:
-            params["search"] = query
-            
-        # Add sort
-        if sort:
-            if sort == "date":
-                params["sort"] = "publication_date:desc"
-            elif sort == "cited":
-                params["sort"] = "cited_by_count:desc"
-            elif sort == "title":
-                params["sort"] = "title:asc"
-                
-        # Build filters
-        filters = []
-        
-        # Year filters - ensure valid year ranges
-        if year_from and isinstance(year_from, int) and year_from > 0:
-            filters.append(f"publication_year:>{year_from-1}")
-        if year_to and isinstance(year_to, int) and year_to > 0:
-            filters.append(f"publication_year:<{year_to+1}")
-            
-        # Journal filter - sanitize input
-        if journal and isinstance(journal, str) and journal.strip():
-            # Remove any characters that might cause issues with the API
-            safe_journal = journal.strip().replace('"', '').replace(':', '')
-            filters.append(f"host_venue.display_name.search:{safe_journal}")
-            
-        # Author filter - sanitize input
-        if author and isinstance(author, str) and author.strip():
-            # Remove any characters that might cause issues with the API
-            safe_author = author.strip().replace('"', '').replace(':', '')
-            filters.append(f"authorships.author.display_name.search:{safe_author}")
-            
-        # Open access filter
-        if open_access_only:
-            filters.append("is_oa:true")
-            
-        # Add filters to params
-        if filters:
-            params["filter"] = ",".join(filters)
+        # Add search term, sort and filters
+        params.update(_build_search_params(
+            query, year_from, year_to, journal, author, open_access_only, sort
+        ))
         
         # Log the request
         logger.info(f"OpenAlex request: {base_url} with params: {params}")
         
-        # Make the request
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(base_url, params=params)
-            
-            # Make the request with retry logic for rate limits
-            max_retries = 3
-            retry_delay = 2  # seconds
+        response = await _openalex_get(
+            base_url, params, timeout=settings.OPENALEX_SEARCH_TIMEOUT, retry_delay=2,
+            endpoint=latency.OPENALEX_SEARCH
+        )
+        if response is None:
+            logger.error("OpenAlex API request failed after all retries")
+            return [], 0
+        
+        if response.status_code == 400:
+            logger.error(f"OpenAlex API bad request: {response.text}")
+            return [], 0
+        elif response.status_code != 200:
+            logger.error(f"OpenAlex API unexpected error: {response.status_code} - {response.text}")
+            return [], 0
+        
+        # Successful response
+        try:
+            records, meta = decode_works_page(response.content, keep_extra=fields == FIELDS_FULL)
+            total_count = meta.get('count') or 0
             
-            for attempt in range(max_retries):
-                try:
-                    response = await client.get(base_url, params=params)
-                    
-                    # Log the response status
-                    logger.info(f"OpenAlex API response status: {response.status_code}")
-                    
-                    if response.status_code == 200:
-                        # Successful response
-                        try:
-                            data = response.json()
-                            
-                            if not data or not isinstance(data, dict):
-                                logger.error(f"Invalid response format from OpenAlex: {type(data)}")
-                                return [], 0
-                            
-                            results = data.get('results', [])
-                            if results is None: results = []
-                                
-                            meta = data.get('meta', {})
-                            if meta is None: meta = {}
-                                
-                            total_count = meta.get('count', 0)
-                            if total_count is None: total_count = 0
-                            
-                            # Format the results (using detailed formatting from openalex_search.py)
-                            formatted_results = []
-                            if not isinstance(results, list):
-                                logger.error(f"Results is not a list: {type(results)}")
-                                return [], 0
-                                
-                            for paper in results:
-                                # Extract authors with affiliations
-                                try:
-                                    authors = []
-                                    for authorship in paper.get("authorships", []):
-                                        author_info = authorship.get("author", {})
-                                        name = author_info.get("display_name", "")
-                                        affiliation = None
-                                        if authorship.get("institutions"):
-                                            institution = authorship.get("institutions", [])[0] if authorship.get("institutions") else None
-                                            if institution:
-                                                affiliation = institution.get("display_name")
-                                        authors.append({"name": name, "affiliation": affiliation})
-                                except Exception as e:
-                                    logger.error(f"Error processing authors: {e}")
-                                    authors = []
-                                
-                                # Reconstruct abstract
-                                abstract = reconstruct_abstract(paper.get("abstract_inverted_index"))
-                                
-                                # Extract journal
-                                journal_name = None
-                                publisher = None
-                                host_venue = paper.get("host_venue") # Use host_venue instead of primary_location for journal
-                                if host_venue:
-                                    journal_name = host_venue.get("display_name")
-                                    publisher = host_venue.get("publisher")
-
-                                # Extract open access info
-                                is_oa = False
-                                oa_url = None
-                                best_oa_location = paper.get("best_oa_location")
-                                if best_oa_location and best_oa_location.get("is_oa"):
-                                    is_oa = True
-                                    oa_url = best_oa_location.get("landing_page_url") or best_oa_location.get("pdf_url")
-                                
-                                # Extract concepts as keywords
-                                keywords = []
-                                if paper.get("concepts"):
-                                    for concept in paper.get("concepts", [])[:5]: # Limit to top 5
-                                        if isinstance(concept, dict) and concept.get("display_name"):
-                                            keywords.append(concept.get("display_name"))
-                                
-                                # Parse publication date
-                                pub_date_str = paper.get("publication_date")
-                                
-                                # Format the paper
-                                formatted_paper = {
-                                    "title": paper.get("title", ""),
-                                    "doi": paper.get("doi", None),
-                                    "authors": authors,
-                                    "publication_date": pub_date_str, # Keep as string for frontend
-                                    "abstract": abstract,
-                                    "journal": journal_name,
-                                    "volume": paper.get("biblio", {}).get("volume", None),
-                                    "issue": paper.get("biblio", {}).get("issue", None),
-                                    "pages": f"{paper.get('biblio', {}).get('first_page', '')}-{paper.get('biblio', {}).get('last_page', '')}" if paper.get('biblio', {}).get('first_page') else None,
-                                    "publisher": publisher,
-                                    "url": paper.get("doi") or (best_oa_location.get("landing_page_url") if best_oa_location else None), # Prefer DOI, fallback to OA landing page
-                                    "is_open_access": is_oa,
-                                    "open_access_url": oa_url,
-                                    "citation_count": paper.get("cited_by_count", 0),
-                                    "references_count": len(paper.get("referenced_works", [])) if paper.get("referenced_works") else 0,
-                                    "keywords": keywords,
-                                    "source": "OpenAlex"
-                                }
-                                formatted_results.append(formatted_paper)
-                            
-                            return formatted_results, total_count
-                        except Exception as e:
-                            logger.error(f"Error processing OpenAlex response: {str(e)}")
-                            return [], 0
-                    
-                    elif response.status_code == 429:
-                        logger.warning(f"OpenAlex API rate limit hit (attempt {attempt+1}/{max_retries}). Waiting {retry_delay}s.")
-                        await asyncio.sleep(retry_delay)
-                        retry_delay *= 2
-                    elif response.status_code == 400:
-                        logger.error(f"OpenAlex API bad request: {response.text}")
-                        return [], 0 # Don't retry on bad request
-                    elif response.status_code >= 500:
-                        logger.warning(f"OpenAlex API server error {response.status_code} (attempt {attempt+1}/{max_retries}). Retrying.")
-                        await asyncio.sleep(retry_delay)
-                    else:
-                        logger.error(f"OpenAlex API unexpected error: {response.status_code} - {response.text}")
-                        return [], 0 # Don't retry unknown errors
-                
-                except httpx.ReadTimeout:
-                    logger.warning(f"OpenAlex API timeout (attempt {attempt+1}/{max_retries}). Retrying.")
-                    if attempt < max_retries - 1:
-                        await asyncio.sleep(retry_delay)
-                        retry_delay *= 2
-                    else:
-                        logger.error("OpenAlex API timeout - max retries reached")
-                        raise # Re-raise after max retries
+            formatted_results = [_format_work(record, include_abstract) for record in records]
             
-            # If loop finishes without returning, all retries failed
-            logger.error("OpenAlex API request failed after all retries")
+            return formatted_results, total_count
+        except Exception as e:
+            logger.error(f"Error processing OpenAlex response: {str(e)}")
             return [], 0
 
     except Exception as e:
         logger.exception(f"Unexpected error in search_papers_direct: {str(e)}") # Use logger.exception for stack trace
         return [], 0
 
+def plan_search_pages(offset: int, limit: int, max_per_page: int = MAX_PER_PAGE) -> Tuple[int, int, int]:
+    """
+    Pick the page size that covers a result window (offset, limit) with the fewest pages.
+    
+    Ties are broken by the smallest page size, so as few unwanted results as
+    possible are downloaded around the window.
+    
+    Returns:
+        Tuple of (per_page, first_page, last_page), pages being 1-based
+    """
+    last_index = offset + limit - 1
+    best = None
+    for per_page in range(1, max_per_page + 1):
+        first_page = offset // per_page + 1
+        last_page = last_index // per_page + 1
+        page_count = last_page - first_page + 1
+        if best is None or page_count < best[0]:
+            best = (page_count, per_page, first_page, last_page)
+            if page_count == 1:
+                break
+    _, per_page, first_page, last_page = best
+    return per_page, first_page, last_page
+
+async def search_papers_window(
+    query: str,
+    offset: int = 0,
+    limit: int = 10,
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    journal: Optional[str] = None,
+    author: Optional[str] = None,
+    open_access_only: bool = False,
+    sort: Optional[str] = None,
+    include_abstract: bool = True
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Search for an arbitrary (offset, limit) window of results.
+    
+    The window is split into the minimal set of OpenAlex pages (see
+    plan_search_pages), which are fetched concurrently (at most
+    OPENALEX_BATCH_CONCURRENCY at a time) through the search cache and shared
+    rate limiter, then stitched and sliced back to exactly the requested window. Windows beyond OpenAlex's 10,000-result paging limit are
+    truncated (a window entirely past it is empty but still reports the total);
+    use iter_search_results to go further.
+    
+    Returns:
+        Tuple of (list of papers in the window, total results count)
+    """
+    offset = max(0, offset)
+    if offset + limit > MAX_PAGED_RESULTS:
+        logger.warning(f"Search window {offset}+{limit} exceeds OpenAlex's {MAX_PAGED_RESULTS}-result paging limit; truncating")
+        limit = MAX_PAGED_RESULTS - offset
+    if limit <= 0:
+        # Nothing in the window, but still report the real total (one cheap, cached 1-result page)
+        _, total_count = await search_papers_direct(
+            query=query,
+            page=1,
+            per_page=1,
+            year_from=year_from,
+            year_to=year_to,
+            journal=journal,
+            author=author,
+            open_access_only=open_access_only,
+            sort=sort,
+            include_abstract=False
+        )
+        return [], total_count
+    
+    per_page, first_page, last_page = plan_search_pages(offset, limit)
+    pages = list(range(first_page, last_page + 1))
+    logger.info(f"Search window {offset}+{limit}: fetching pages {first_page}-{last_page} with per_page={per_page}")
+    semaphore = asyncio.Semaphore(settings.OPENALEX_BATCH_CONCURRENCY)
+    
+    async def fetch_page(page: int) -> Tuple[List[Dict[str, Any]], int]:
+        async with semaphore:
+            return await search_papers_direct(
+                query=query,
+                page=page,
+                per_page=per_page,
+                year_from=year_from,
+                year_to=year_to,
+                journal=journal,
+                author=author,
+                open_access_only=open_access_only,
+                sort=sort,
+                include_abstract=include_abstract
+            )
+    
+    page_results = await asyncio.gather(*(fetch_page(page) for page in pages))
+    
+    stitched: List[Dict[str, Any]] = []
+    total_count = 0
+    for results, count in page_results:
+        total_count = max(total_count, count)
+        stitched.extend(results)
+        # A short (or failed) page means nothing after it can line up with the window
+        if len(results) < per_page:
+            break
+    
+    start = offset - (first_page - 1) * per_page
+    return stitched[start:start + limit], total_count
+
+# --- Facet Counts ---
+async def _fetch_facet(params: Dict[str, Any], field: str) -> Optional[List[Dict[str, Any]]]:
+    """Run one group_by request. Returns the groups, or None on failure."""
+    response = await _openalex_get(
+        "/works", {**params, "group_by": field}, timeout=settings.OPENALEX_SEARCH_TIMEOUT,
+        endpoint=latency.OPENALEX_FACETS
+    )
+    if response is None or response.status_code != 200:
+        logger.error(f"OpenAlex group_by {field} failed: {response.status_code if response is not None else 'no response'}")
+        return None
+    
+    groups = decode_json(response.content).get("group_by") or []
+    return [
+        {"key": group.get("key"), "name": group.get("key_display_name"), "count": group.get("count", 0)}
+        for group in groups
+    ]
+
+async def get_search_facets(
+    query: str,
+    facets: Optional[List[str]] = None,
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    journal: Optional[str] = None,
+    author: Optional[str] = None,
+    open_access_only: bool = False
+) -> Dict[str, Optional[List[Dict[str, Any]]]]:
+    """
+    Get result counts grouped by facet for a search, without fetching any works.
+    
+    One group_by request is issued per facet, concurrently, and each result
+    is cached like a search page.
+    
+    Args:
+        query: Search query
+        facets: group_by fields to count (defaults to all of FACET_FIELDS)
+        year_from, year_to, journal, author, open_access_only: As for search_papers_direct
+        
+    Returns:
+        Mapping of facet field to a list of {"key", "name", "count"} groups
+        (None for a facet whose request failed)
+    """
+    facets = [f for f in (facets or FACET_FIELDS) if f in FACET_FIELDS]
+    params = {
+        "mailto": EMAIL,
+        **_build_search_params(query, year_from, year_to, journal, author, open_access_only)
+    }
+    base_key = _search_cache_key(
+        query, 0, 0, year_from, year_to, journal, author, open_access_only, None, FIELDS_BASIC, False
+    )
+    
+    async def facet(field: str) -> Optional[List[Dict[str, Any]]]:
+        cached = facet_cache.get((base_key, field))
+        if cached is not None and get_breaker(OPENALEX).is_open:
+            return cached[0]
+        return await facet_cache.get_or_fetch(
+            (base_key, field), lambda: _fetch_facet(params, field), cacheable=lambda groups: groups is not None
+        )
+    
+    counts = await asyncio.gather(*(facet(field) for field in facets))
+    return dict(zip(facets, counts))
+
+# --- Streaming Harvester ---
+async def iter_search_results(
+    query: str,
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    journal: Optional[str] = None,
+    author: Optional[str] = None,
+    open_access_only: bool = False,
+    sort: Optional[str] = None,
+    fields: str = FIELDS_BASIC,
+    include_abstract: bool = True,
+    max_results: Optional[int] = None,
+    prefetch_pages: int = 1
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Stream every formatted work matching a search, using OpenAlex cursor paging.
+    
+    Unlike search_papers_direct this is not limited to the first 10,000 results.
+    Pages of CURSOR_PAGE_SIZE works are fetched by a background task into a
+    bounded queue, so at most prefetch_pages pages are buffered ahead of the
+    consumer; a slow consumer pauses fetching instead of growing memory.
+    
+    Args:
+        query: Search query
+        year_from, year_to, journal, author, open_access_only, sort: As for search_papers_direct
+        fields: "basic" or "full", as for search_papers_direct
+        include_abstract: Set False to skip downloading and reconstructing abstracts
+        max_results: Stop after this many works (None for the full result set)
+        prefetch_pages: Number of pages to fetch ahead of the consumer
+        
+    Yields:
+        Formatted paper dicts, in result order
+        
+    Raises:
+        RuntimeError: If OpenAlex fails mid-harvest (after retries), so a
+            partial harvest is never mistaken for a complete one
+    """
+    params = {
+        "per-page": CURSOR_PAGE_SIZE,
+        "mailto": EMAIL,
+        **_select_params(fields, include_abstract),
+        **_build_search_params(query, year_from, year_to, journal, author, open_access_only, sort)
+    }
+    
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, prefetch_pages))
+    done = object()
+    
+    async def produce() -> None:
+        cursor = "*"
+        page_count = 0
+        try:
+            while cursor:
+                response = await _openalex_get(
+                    "/works", {**params, "cursor": cursor}, timeout=settings.OPENALEX_SEARCH_TIMEOUT
+                )
+                if response is None:
+                    raise RuntimeError("OpenAlex request failed after all retries")
+                if response.status_code != 200:
+                    raise RuntimeError(f"OpenAlex API error {response.status_code}: {response.text}")
+                
+                records, meta = decode_works_page(response.content, keep_extra=fields == FIELDS_FULL)
+                page_count += 1
+                if page_count == 1:
+                    logger.info(f"OpenAlex harvest started: {meta.get('count', 0)} works")
+                
+                # Blocks while the queue is full, which is what applies backpressure
+                await queue.put([_format_work(record, include_abstract) for record in records])
+                
+                cursor = meta.get("next_cursor") if records else None
+            await queue.put(done)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"OpenAlex harvest failed after {page_count} pages: {str(e)}")
+            await queue.put(e)
+    
+    if max_results is not None and max_results <= 0:
+        return
+    
+    producer = asyncio.create_task(produce())
+    yielded = 0
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise RuntimeError(f"OpenAlex harvest failed: {item}") from item
+            for work in item:
+                yield work
+                yielded += 1
+                if max_results is not None and yielded >= max_results:
+                    return
+    finally:
+        producer.cancel()
+        try:
+            await producer
+        except (asyncio.CancelledError, Exception):
+            pass
+
 # --- Consolidated DOI Lookup Function ---
-async def get_paper_by_doi_direct(doi: str) -> Optional[Dict[str, Any]]:
+async def get_paper_by_doi_direct(doi: str, fields: str = FIELDS_BASIC) -> Optional[Dict[str, Any]]:
     """
     Get paper details from OpenAlex using DOI using the direct client logic.
     
+    The local work store is consulted first; stored records are only refetched
+    once they are older than WORK_STORE_MAX_AGE_DAYS, and are still served if
+    that refetch fails. Concurrent lookups of the same DOI and mode share one
+    request. Store and local index reads and writes run in the threadpool. The store only holds basic records, so full-mode lookups always
+    go to OpenAlex (or the local index when OPENALEX_LOCAL_MODE is "only").
+    
     Args:
         doi: The DOI of the paper
+        fields: "basic" or "full", as for search_papers_direct
         
     Returns:
         Formatted paper details if available, None otherwise
     """
+    normalized = normalize_doi(doi)
+    if not normalized:
+        return None
+    
+    if _use_local_index(fields):
+        local = (await run_in_threadpool(local_index.get_local_works_by_dois, [normalized])).get(normalized)
+        if local or settings.OPENALEX_LOCAL_MODE == local_index.LOCAL_MODE_ONLY:
+            return local
+    
+    stored = await run_in_threadpool(work_store.get_work_by_doi, normalized) if fields == FIELDS_BASIC else None
+    if stored and work_store.is_fresh(stored[1]):
+        return stored[0]
+    
+    async def fetch_and_store() -> Optional[Dict[str, Any]]:
+        fetched = await _fetch_paper_by_doi(normalized, fields)
+        if fetched and fields == FIELDS_BASIC:
+            await run_in_threadpool(work_store.put_works, [(normalized, fetched)])
+        return fetched
+    
+    paper = await doi_lookups.do((normalized, fields), fetch_and_store)
+    if paper:
+        return paper
+    
+    if stored:
+        logger.info(f"Serving stored OpenAlex record for DOI {normalized} after failed revalidation")
+        return stored[0]
+    return None
+
+async def _fetch_paper_by_doi(doi: str, fields: str = FIELDS_BASIC) -> Optional[Dict[str, Any]]:
+    """Look up a single normalized DOI on OpenAlex, bypassing the work store."""
     try:
-        # OpenAlex uses DOIs with "https://doi.org/" prefix or just the DOI suffix
-        # Let's try the suffix first as it seems more reliable based on API docs examples
-        doi_suffix = doi.replace("https://doi.org/", "")
+        # OpenAlex resolves external IDs on the single-work endpoint as "doi:<doi>"
+        url = f"/works/doi:{doi}"
+        params = {"mailto": EMAIL, **_select_params(fields)}
         
-        url = f"https://api.openalex.org/works/{doi_suffix}"
-        params = {"mailto": EMAIL}
+        logger.info(f"Attempting OpenAlex DOI lookup: {url}")
+        # Shorter retry delay for single lookup
+        response = await _openalex_get(
+            url, params, timeout=settings.OPENALEX_LOOKUP_TIMEOUT, retry_delay=1,
+            endpoint=latency.OPENALEX_LOOKUP, hedge=True
+        )
+        if response is None:
+            logger.error(f"OpenAlex DOI lookup failed after all retries for DOI {doi}")
+            return None
         
-        # Make the request with retry logic
-        max_retries = 3
-        retry_delay = 1 # Shorter delay for single lookup
-
-        async with httpx.AsyncClient(timeout=15.0) as client: # Slightly longer timeout for single lookup
-            for attempt in range(max_retries):
-                try:
-                    logger.info(f"Attempting OpenAlex DOI lookup: {url}")
-                    response = await client.get(url, params=params)
-                    
-                    if response.status_code == 200:
-                        paper = response.json()
-                        # Format the single result using the same logic as search
-                        # (Could be refactored into a shared formatting function later)
-                        try:
-                            authors = []
-                            for authorship in paper.get("authorships", []):
-                                author_info = authorship.get("author", {})
-                                name = author_info.get("display_name", "")
-                                affiliation = None
-                                if authorship.get("institutions"):
-                                    institution = authorship.get("institutions", [])[0] if authorship.get("institutions") else None
-                                    if institution: affiliation = institution.get("display_name")
-                                authors.append({"name": name, "affiliation": affiliation})
-                        except Exception as e: authors = []
-
-                        abstract = reconstruct_abstract(paper.get("abstract_inverted_index"))
-                        
-                        journal_name = None
-                        publisher = None
-                        host_venue = paper.get("host_venue")
-                        if host_venue:
-                            journal_name = host_venue.get("display_name")
-                            publisher = host_venue.get("publisher")
-
-                        is_oa = False
-                        oa_url = None
-                        best_oa_location = paper.get("best_oa_location")
-                        if best_oa_location and best_oa_location.get("is_oa"):
-                            is_oa = True
-                            oa_url = best_oa_location.get("landing_page_url") or best_oa_location.get("pdf_url")
-                        
-                        keywords = []
-                        if paper.get("concepts"):
-                            for concept in paper.get("concepts", [])[:5]:
-                                if isinstance(concept, dict) and concept.get("display_name"):
-                                    keywords.append(concept.get("display_name"))
-                        
-                        pub_date_str = paper.get("publication_date")
-
-                        formatted_paper = {
-                            "title": paper.get("title", ""), "doi": paper.get("doi", None),
-                            "authors": authors, "publication_date": pub_date_str,
-                            "abstract": abstract, "journal": journal_name,
-                            "volume": paper.get("biblio", {}).get("volume", None),
-                            "issue": paper.get("biblio", {}).get("issue", None),
-                            "pages": f"{paper.get('biblio', {}).get('first_page', '')}-{paper.get('biblio', {}).get('last_page', '')}" if paper.get('biblio', {}).get('first_page') else None,
-                            "publisher": publisher,
-                            "url": paper.get("doi") or (best_oa_location.get("landing_page_url") if best_oa_location else None),
-                            "is_open_access": is_oa, "open_access_url": oa_url,
-                            "citation_count": paper.get("cited_by_count", 0),
-                            "references_count": len(paper.get("referenced_works", [])) if paper.get("referenced_works") else 0,
-                            "keywords": keywords, "source": "OpenAlex"
-                        }
-                        return formatted_paper
-                        
-                    elif response.status_code == 429:
-                        logger.warning(f"OpenAlex DOI lookup rate limit (attempt {attempt+1}/{max_retries}). Waiting {retry_delay}s.")
-                        await asyncio.sleep(retry_delay)
-                        retry_delay *= 2
-                    elif response.status_code == 404:
-                        logger.warning(f"Paper with DOI {doi} (suffix: {doi_suffix}) not found in OpenAlex.")
-                        return None # Not found, don't retry
-                    else:
-                        logger.warning(f"OpenAlex DOI lookup error {response.status_code} (attempt {attempt+1}/{max_retries}). Retrying.")
-                        await asyncio.sleep(retry_delay)
-            
-                except httpx.ReadTimeout:
-                    logger.warning(f"OpenAlex DOI lookup timeout (attempt {attempt+1}/{max_retries}). Retrying.")
-                    if attempt < max_retries - 1:
-                        await asyncio.sleep(retry_delay)
-                        retry_delay *= 2
-                    else:
-                        logger.error("OpenAlex DOI lookup timeout - max retries reached")
-                        return None # Timeout after retries
+        if response.status_code == 404:
+            logger.warning(f"Paper with DOI {doi} not found in OpenAlex.")
+            return None # Not found, don't retry
+        elif response.status_code != 200:
+            logger.error(f"OpenAlex DOI lookup error {response.status_code} for DOI {doi}")
+            return None
         
-        # If loop finishes, all retries failed
-        logger.error(f"OpenAlex DOI lookup failed after all retries for DOI {doi}")
-        return None
-    
+        return _format_work(decode_work(response.content, keep_extra=fields == FIELDS_FULL))
+
     except Exception as e:
         logger.exception(f"Unexpected error retrieving paper details from OpenAlex for DOI {doi}: {str(e)}")
         return None
+
+# --- Batched DOI Lookup Function ---
+async def _fetch_doi_batch(dois: List[str], fields: str = FIELDS_BASIC) -> List[WorkRecord]:
+    """Fetch one batch of DOIs with a single OR-ed filter query. Returns decoded work records."""
+    params = {
+        "filter": "doi:" + "|".join(dois),
+        "per-page": len(dois),
+        "mailto": EMAIL,
+        **_select_params(fields)
+    }
+    response = await _openalex_get(
+        "/works", params, timeout=settings.OPENALEX_LOOKUP_TIMEOUT, retry_delay=1,
+        endpoint=latency.OPENALEX_BATCH, hedge=True
+    )
+    if response is None:
+        logger.error(f"OpenAlex batch DOI lookup failed after all retries ({len(dois)} DOIs)")
+        return []
+    if response.status_code != 200:
+        logger.error(f"OpenAlex batch DOI lookup error {response.status_code}: {response.text}")
+        return []
+    records, _ = decode_works_page(response.content, keep_extra=fields == FIELDS_FULL)
+    return records
+
+
+async def get_papers_by_dois_direct(dois: List[str], fields: str = FIELDS_BASIC) -> Dict[str, Dict[str, Any]]:
+    """
+    Get paper details from OpenAlex for many DOIs at once.
+    
+    DOIs are packed DOI_BATCH_SIZE at a time into "filter=doi:a|b|c" queries and
+    the batches are fetched concurrently on the shared client. As in
+    get_paper_by_doi_direct, full-mode lookups bypass the work store.
+    
+    Args:
+        dois: DOIs in any common form (bare, "doi:" or resolver URL)
+        fields: "basic" or "full", as for search_papers_direct
+        
+    Returns:
+        Formatted paper details keyed by normalized DOI. DOIs that OpenAlex
+        does not know are simply absent from the result.
+    """
+    unique_dois = []
+    seen = set()
+    for doi in dois:
+        normalized = normalize_doi(doi)
+        if normalized and normalized not in seen:
+            seen.add(normalized)
+            unique_dois.append(normalized)
+    
+    if not unique_dois:
+        return {}
+    
+    local: Dict[str, Dict[str, Any]] = {}
+    if _use_local_index(fields):
+        local = await run_in_threadpool(local_index.get_local_works_by_dois, unique_dois)
+        if settings.OPENALEX_LOCAL_MODE == local_index.LOCAL_MODE_ONLY:
+            return local
+        unique_dois = [d for d in unique_dois if d not in local]
+    
+    # Serve fresh records from the local work store and only fetch the rest
+    stored = await run_in_threadpool(work_store.get_works_by_dois, unique_dois) if fields == FIELDS_BASIC else {}
+    papers: Dict[str, Dict[str, Any]] = {
+        doi: data for doi, (data, fetched_at) in stored.items() if work_store.is_fresh(fetched_at)
+    }
+    papers.update(local)
+    to_fetch = [d for d in unique_dois if d not in papers]
+    if not to_fetch:
+        return papers
+    
+    # "|" and "," are filter syntax in OpenAlex, so DOIs containing them must be looked up one by one
+    batchable = [d for d in to_fetch if "|" not in d and "," not in d]
+    singles = [d for d in to_fetch if "|" in d or "," in d]
+    
+    batches = [batchable[i:i + DOI_BATCH_SIZE] for i in range(0, len(batchable), DOI_BATCH_SIZE)]
+    semaphore = asyncio.Semaphore(settings.OPENALEX_BATCH_CONCURRENCY)
+    
+    async def run_batch(batch: List[str]) -> List[WorkRecord]:
+        async with semaphore:
+            try:
+                return await _fetch_doi_batch(batch, fields)
+            except Exception as e:
+                logger.exception(f"Unexpected error in OpenAlex batch DOI lookup: {str(e)}")
+                return []
+    
+    logger.info(f"OpenAlex batch DOI lookup: {len(to_fetch)} of {len(unique_dois)} DOIs "
+                f"not in the work store, fetching in {len(batches)} requests")
+    batch_results = await asyncio.gather(*(run_batch(batch) for batch in batches))
+    
+    fetched: List[Tuple[str, Dict[str, Any]]] = []
+    for results in batch_results:
+        for record in results:
+            key = normalize_doi(record.doi)
+            if key:
+                fetched.append((key, _format_work(record)))
+    
+    for doi in singles:
+        formatted = await _fetch_paper_by_doi(doi, fields)
+        if formatted:
+            fetched.append((doi, formatted))
+    
+    if fields == FIELDS_BASIC:
+        await run_in_threadpool(work_store.put_works, fetched)
+    papers.update(fetched)
+    
+    # Fall back to stale stored records for anything the refetch didn't return
+    for doi, (data, fetched_at) in stored.items():
+        papers.setdefault(doi, data)
+    
+    return papers
+
+# --- On-demand Abstract Lookup ---
+async def get_work_abstract(work_id: str) -> Optional[str]:
+    """
+    Fetch and reconstruct the abstract of a single work.
+    
+    Used to materialize abstracts lazily for results fetched with include_abstract=False.
+    
+    Args:
+        work_id: OpenAlex work ID ("W123..." or its https://openalex.org/ URL)
+        
+    Returns:
+        The abstract text, or None if the work has no abstract or was not found
+    """
+    work_id = work_id.strip().rsplit("/", 1)[-1]
+    if not work_id:
+        return None
+    
+    params = {"mailto": EMAIL, "select": "id,abstract_inverted_index"}
+    response = await _openalex_get(
+        f"/works/{work_id}", params, timeout=settings.OPENALEX_LOOKUP_TIMEOUT, retry_delay=1,
+        endpoint=latency.OPENALEX_LOOKUP
+    )
+    if response is None or response.status_code != 200:
+        logger.warning(f"Could not fetch abstract for OpenAlex work {work_id}")
+        return None
+    
+    return reconstruct_abstract(decode_work(response.content).abstract_inverted_index)
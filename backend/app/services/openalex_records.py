@@ -0,0 +1,179 @@
+"""
+Typed decoding of OpenAlex work responses.
+
+Responses are parsed with orjson when it is installed (falling back to the
+standard json module) and each work is read once into small slotted records
+holding only the fields the app uses. The search, DOI and harvest paths all
+format papers from these records instead of walking the raw dict trees.
+"""
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # Optional speed-up; the standard library decoder works too
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Number of concepts exposed as keywords
+MAX_KEYWORDS = 5
+
+# Root-level work fields read by WorkRecord. OpenAlex's "select" only accepts
+# root-level fields, so nested objects (authorships, locations) come back whole.
+WORK_FIELDS = (
+    "id",
+    "doi",
+    "title",
+    "publication_date",
+    "authorships",
+    "abstract_inverted_index",
+    "primary_location",
+    "best_oa_location",
+    "biblio",
+    "cited_by_count",
+    "referenced_works_count",
+    "concepts",
+)
+
+
+def decode_json(content: bytes) -> Any:
+    """Parse a JSON response body with the fastest available decoder."""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+class AuthorRecord:
+    __slots__ = ("name", "affiliation")
+
+    def __init__(self, name: str, affiliation: Optional[str]):
+        self.name = name
+        self.affiliation = affiliation
+
+    @classmethod
+    def from_authorship(cls, authorship: Dict[str, Any]) -> "AuthorRecord":
+        author = authorship.get("author") or {}
+        institutions = authorship.get("institutions")
+        affiliation = institutions[0].get("display_name") if institutions else None
+        return cls(author.get("display_name") or "", affiliation)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "affiliation": self.affiliation}
+
+
+class WorkRecord:
+    """
+    The subset of an OpenAlex work that the app formats into a paper.
+
+    With keep_extra, the root-level fields outside WORK_FIELDS are kept as
+    they came (in `extra`) and passed through to the paper dict.
+    """
+    __slots__ = (
+        "openalex_id", "doi", "title", "publication_date", "authors",
+        "abstract_inverted_index", "journal", "publisher",
+        "volume", "issue", "first_page", "last_page",
+        "is_oa", "oa_url", "oa_landing_page_url",
+        "citation_count", "references_count", "keywords", "extra",
+    )
+
+    def __init__(self, work: Dict[str, Any], keep_extra: bool = False):
+        get = work.get
+        self.openalex_id: Optional[str] = get("id")
+        self.doi: Optional[str] = get("doi")
+        self.title: str = get("title") or ""
+        self.publication_date: Optional[str] = get("publication_date")
+
+        try:
+            self.authors = [AuthorRecord.from_authorship(a) for a in get("authorships") or ()]
+        except Exception as e:
+            logger.error(f"Error processing authors: {e}")
+            self.authors = []
+
+        self.abstract_inverted_index: Optional[Dict[str, List[int]]] = get("abstract_inverted_index")
+
+        # Journal comes from the primary location's source (host_venue was retired by OpenAlex)
+        source = (get("primary_location") or {}).get("source") or {}
+        self.journal: Optional[str] = source.get("display_name")
+        self.publisher: Optional[str] = source.get("host_organization_name")
+
+        biblio = get("biblio") or {}
+        self.volume: Optional[str] = biblio.get("volume")
+        self.issue: Optional[str] = biblio.get("issue")
+        self.first_page: Optional[str] = biblio.get("first_page")
+        self.last_page: Optional[str] = biblio.get("last_page")
+
+        best_oa = get("best_oa_location") or {}
+        self.oa_landing_page_url: Optional[str] = best_oa.get("landing_page_url")
+        self.is_oa: bool = bool(best_oa.get("is_oa"))
+        self.oa_url: Optional[str] = (self.oa_landing_page_url or best_oa.get("pdf_url")) if self.is_oa else None
+
+        self.citation_count: int = get("cited_by_count") or 0
+        self.references_count: int = get("referenced_works_count") or len(get("referenced_works") or ())
+
+        self.keywords: List[str] = [
+            concept["display_name"]
+            for concept in (get("concepts") or ())[:MAX_KEYWORDS]
+            if isinstance(concept, dict) and concept.get("display_name")
+        ]
+
+        self.extra: Optional[Dict[str, Any]] = (
+            {key: value for key, value in work.items() if key not in WORK_FIELDS} if keep_extra else None
+        )
+
+    def to_paper(self, abstract: Optional[str]) -> Dict[str, Any]:
+        """Build the paper dict used across the app (with an "extra" dict if extra fields were kept)."""
+        paper = {
+            "openalex_id": self.openalex_id,
+            "title": self.title,
+            "doi": self.doi,
+            "authors": [a.to_dict() for a in self.authors],
+            "publication_date": self.publication_date,  # Keep as string for frontend
+            "abstract": abstract,
+            "journal": self.journal,
+            "volume": self.volume,
+            "issue": self.issue,
+            "pages": f"{self.first_page}-{self.last_page or ''}" if self.first_page else None,
+            "publisher": self.publisher,
+            "url": self.doi or self.oa_landing_page_url,  # Prefer DOI, fallback to OA landing page
+            "is_open_access": self.is_oa,
+            "open_access_url": self.oa_url,
+            "citation_count": self.citation_count,
+            "references_count": self.references_count,
+            "keywords": self.keywords,
+            "source": "OpenAlex",
+        }
+        if self.extra is not None:
+            paper["extra"] = self.extra
+        return paper
+
+
+def decode_work(content: bytes, keep_extra: bool = False) -> WorkRecord:
+    """Decode a single-work response body."""
+    return WorkRecord(decode_json(content), keep_extra)
+
+
+def decode_works_page(content: bytes, keep_extra: bool = False) -> Tuple[List[WorkRecord], Dict[str, Any]]:
+    """
+    Decode a /works list response body.
+
+    Args:
+        content: Response body
+        keep_extra: Keep the fields outside WORK_FIELDS on each record (see WorkRecord)
+
+    Returns:
+        Tuple of (work records, meta dict)
+
+    Raises:
+        ValueError: If the body is not a works list response
+    """
+    data = decode_json(content)
+    if not data or not isinstance(data, dict):
+        raise ValueError(f"Invalid response format from OpenAlex: {type(data)}")
+
+    results = data.get("results") or []
+    if not isinstance(results, list):
+        raise ValueError(f"Results is not a list: {type(results)}")
+
+    return [WorkRecord(work, keep_extra) for work in results], data.get("meta") or {}
@@ -1,40 +1,185 @@
-import httpx
+import asyncio
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Callable, Awaitable
 
 from app.core.config import settings
 # Updated import to use the consolidated direct client
-from app.services.openalex_direct import get_paper_by_doi_direct 
+from app.services.openalex_direct import get_paper_by_doi_direct, get_papers_by_dois_direct, normalize_doi
+from app.services.unpaywall_client import get_unpaywall_data, get_unpaywall_data_many
 
 logger = logging.getLogger(__name__)
 
-async def get_paper_pdf_url(doi: str) -> Optional[str]:
+# Source names used by the PDF URL preference policy
+OPENALEX_SOURCE = "openalex"
+UNPAYWALL_SOURCE = "unpaywall"
+
+
+async def _race_pdf_sources(doi: str, sources: Dict[str, Callable[[], Awaitable[Optional[str]]]]) -> Optional[str]:
+    """
+    Query every PDF URL source concurrently and pick a URL by PDF_URL_PREFERENCE.
+    
+    With preference "first", the first source to produce a URL wins. With a
+    source name, that source's URL wins whenever it has one; a URL from the
+    other source is returned once the preferred source comes back empty, or
+    after PDF_URL_PREFERENCE_GRACE seconds. Sources still running when the
+    answer is known are cancelled.
+    """
+    preferred = settings.PDF_URL_PREFERENCE
+    tasks = {asyncio.ensure_future(fn()): name for name, fn in sources.items()}
+    found: Dict[str, str] = {}
+    pending = set(tasks)
+    loop = asyncio.get_running_loop()
+    deadline: Optional[float] = None
+    
+    try:
+        while pending:
+            timeout = max(0.0, deadline - loop.time()) if deadline is not None else None
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                logger.info(f"Preferred PDF source '{preferred}' still pending for DOI {doi} after grace period")
+                break
+            for task in done:
+                if task.exception() is not None:
+                    logger.warning(f"PDF URL lookup via {tasks[task]} failed for DOI {doi}: {task.exception()}")
+                elif task.result():
+                    found[tasks[task]] = task.result()
+            
+            if preferred in found or (found and preferred not in sources):
+                break
+            if found and deadline is None:
+                deadline = loop.time() + settings.PDF_URL_PREFERENCE_GRACE
+    finally:
+        # Cancel the loser; shared lookups it joined keep running for their other callers
+        for task in pending:
+            task.cancel()
+    
+    if not found:
+        return None
+    source = preferred if preferred in found else next(iter(found))
+    logger.info(f"PDF URL for DOI {doi} taken from {source}")
+    return found[source]
+
+
+async def _unpaywall_pdf_url(doi: str) -> Optional[str]:
+    from app.services.unpaywall import get_paper_access
+    
+    access_info = await get_paper_access(doi)
+    return access_info.get("open_access_url")
+
+
+async def get_paper_pdf_url(doi: str, openalex_paper: Optional[Dict[str, Any]] = None) -> Optional[str]:
     """
     Get PDF URL for a paper primarily using OpenAlex, with fallback to Unpaywall.
     
+    Unpaywall lookups answer DOIs imported from an Unpaywall snapshot locally
+    (see get_unpaywall_data). With PDF_URL_STRATEGY "race", both
+    sources are queried concurrently and the URL is chosen by
+    PDF_URL_PREFERENCE (see _race_pdf_sources), so latency is bounded by the
+    faster source rather than the sum of both.
+    
     Args:
         doi: The DOI of the paper
+        openalex_paper: The paper's OpenAlex record if the caller already has it
+            (e.g. a search hit); used instead of looking the DOI up again
         
     Returns:
         URL to the PDF if available, None otherwise
     """
-    # First try OpenAlex using the consolidated direct function
-    paper_data = await get_paper_by_doi_direct(doi)
+    async def from_openalex() -> Optional[str]:
+        paper_data = openalex_paper if openalex_paper is not None else await get_paper_by_doi_direct(doi)
+        return paper_data.get("open_access_url") if paper_data else None
     
-    if paper_data:
-        # Extract open access URL from the formatted OpenAlex data
-        # The direct function now returns 'open_access_url' directly
-        oa_url = paper_data.get("open_access_url")
-        if oa_url:
-            logger.info(f"PDF URL found in OpenAlex for DOI {doi}")
-            return oa_url
+    if settings.PDF_URL_STRATEGY == "race":
+        return await _race_pdf_sources(doi, {
+            OPENALEX_SOURCE: from_openalex,
+            UNPAYWALL_SOURCE: lambda: _unpaywall_pdf_url(doi),
+        })
+    
+    # First try OpenAlex using the consolidated direct function
+    oa_url = await from_openalex()
+    if oa_url:
+        logger.info(f"PDF URL found in OpenAlex for DOI {doi}")
+        return oa_url
 
     # Fallback to Unpaywall if OpenAlex didn't have the PDF URL
     logger.info(f"OpenAlex didn't have PDF URL for DOI {doi}, falling back to Unpaywall")
-    from app.services.unpaywall import get_paper_access
+    return await _unpaywall_pdf_url(doi)
+
+async def get_paper_pdf_urls(
+    dois: List[str],
+    openalex_papers: Optional[Dict[str, Dict[str, Any]]] = None
+) -> Dict[str, Optional[str]]:
+    """
+    Get PDF URLs for many papers, using batched OpenAlex lookups with bulk Unpaywall fallback.
     
-    access_info = await get_paper_access(doi)
-    return access_info.get("open_access_url")
+    With PDF_URL_STRATEGY "race", each DOI's Unpaywall lookup starts alongside
+    the batched OpenAlex lookup instead of after it. Unpaywall lookups answer
+    DOIs from the local snapshot data without network calls.
+    
+    Args:
+        dois: The DOIs of the papers
+        openalex_papers: OpenAlex records the caller already has (e.g. search
+            hits), keyed by normalized DOI; only the other DOIs are looked up
+        
+    Returns:
+        Mapping of normalized DOI to the PDF URL (None when no open access copy was found)
+    """
+    dois = list(dict.fromkeys(k for k in (normalize_doi(d) for d in dois) if k))
+    known = openalex_papers or {}
+    
+    async def openalex_records(lookup: List[str]) -> Dict[str, Dict[str, Any]]:
+        rest = [doi for doi in lookup if doi not in known]
+        papers = await get_papers_by_dois_direct(rest) if rest else {}
+        return {**{doi: known[doi] for doi in lookup if doi in known}, **papers}
+    
+    if settings.PDF_URL_STRATEGY == "race":
+        semaphore = asyncio.Semaphore(settings.UNPAYWALL_BATCH_CONCURRENCY)
+        
+        async def from_unpaywall(doi: str) -> Optional[str]:
+            async with semaphore:
+                return await _unpaywall_pdf_url(doi)
+        
+        bulk = asyncio.ensure_future(openalex_records(dois))
+        
+        async def from_openalex(doi: str) -> Optional[str]:
+            # Shielded: one DOI's race being decided must not cancel the shared batch lookup
+            papers = await asyncio.shield(bulk)
+            return (papers.get(doi) or {}).get("open_access_url")
+        
+        async def resolve(doi: str) -> Optional[str]:
+            return await _race_pdf_sources(doi, {
+                OPENALEX_SOURCE: lambda: from_openalex(doi),
+                UNPAYWALL_SOURCE: lambda: from_unpaywall(doi),
+            })
+        
+        try:
+            urls = await asyncio.gather(*(resolve(doi) for doi in dois))
+        finally:
+            if not bulk.done():
+                bulk.cancel()
+        return dict(zip(dois, urls))
+    
+    if not dois:
+        return {}
+    papers = await openalex_records(dois)
+    
+    pdf_urls: Dict[str, Optional[str]] = {}
+    missing = []
+    for doi in dois:
+        oa_url = (papers.get(doi) or {}).get("open_access_url")
+        pdf_urls[doi] = oa_url
+        if not oa_url:
+            missing.append(doi)
+    
+    logger.info(f"PDF URLs found in OpenAlex for {len(dois) - len(missing)}/{len(dois)} DOIs, "
+                f"falling back to Unpaywall for the rest")
+    
+    # Bulk Unpaywall lookups run on a bounded worker pool and arrive as they complete
+    async for doi, data in get_unpaywall_data_many(missing):
+        if "error" in data:
+            logger.warning(f"Unpaywall API error for DOI {doi}: {data.get('error')}")
+        pdf_urls[doi] = data.get("open_access_url")
+    return pdf_urls
 
 async def get_paper_details(doi: str) -> Dict[str, Any]:
     """
@@ -65,39 +210,33 @@ async def get_paper_details(doi: str) -> Dict[str, Any]:
             "journal_issns": None # Also not directly in the simplified format
         }
     
-    # Fallback to Unpaywall
+    # Fallback to Unpaywall (shares any in-flight lookup for this DOI, e.g. from get_paper_pdf_url)
     logger.info(f"OpenAlex didn't have details for DOI {doi}, falling back to Unpaywall")
-    url = f"https://api.unpaywall.org/v2/{doi}"
-    
-    params = {
-        "email": settings.UNPAYWALL_EMAIL
+    paper_info: Dict[str, Any] = {
+        "is_oa": False,
+        "pdf_url": None,
+        "url": None,
+        "oa_status": None,
+        "journal_is_oa": None,
+        "journal_issns": None
     }
     
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(url, params=params)
-            
-            if response.status_code == 200:
-                data = response.json()
-                
-                paper_info["is_oa"] = data.get("is_oa", False)
-                paper_info["oa_status"] = data.get("oa_status")
-                paper_info["journal_is_oa"] = data.get("journal_is_oa", False)
-                paper_info["journal_issns"] = data.get("journal_issns")
-                
-                # Get PDF URL and other URLs
-                best_location = data.get('best_oa_location')
-                if best_location:
-                    paper_info["pdf_url"] = best_location.get('url_for_pdf')
-                    paper_info["url"] = best_location.get('url')
-                    paper_info["version"] = best_location.get('version')
-                    paper_info["license"] = best_location.get('license')
-            elif response.status_code == 422:
-                logger.warning(f"Unpaywall API error for DOI {doi}: Invalid DOI format")
-            else:
-                logger.warning(f"Unpaywall API error for DOI {doi}: HTTP {response.status_code}")
-    
-    except Exception as e:
-        logger.error(f"Error retrieving paper details for DOI {doi}: {str(e)}")
+    data = await get_unpaywall_data(doi)
+    if 'error' in data:
+        logger.warning(f"Unpaywall API error for DOI {doi}: {data.get('error')}")
+        return paper_info
+    
+    paper_info["is_oa"] = data.get("is_open_access", False)
+    paper_info["oa_status"] = data.get("oa_status")
+    paper_info["journal_is_oa"] = data.get("journal_is_oa", False)
+    paper_info["journal_issns"] = data.get("journal_issns")
+    
+    # Get PDF URL and other URLs
+    best_location = data.get('best_oa_location')
+    if best_location:
+        paper_info["pdf_url"] = best_location.get('url_for_pdf')
+        paper_info["url"] = best_location.get('url')
+        paper_info["version"] = best_location.get('version')
+        paper_info["license"] = best_location.get('license')
     
     return paper_info
@@ -0,0 +1,131 @@
+"""
+Shared per-host rate limiting for external scholarly APIs.
+
+Every request to an upstream host first takes a token from that host's
+bucket, so concurrent users and batch jobs together stay inside the polite
+pool limits instead of each pacing themselves with fixed sleeps.
+"""
+import asyncio
+import logging
+import time
+from datetime import date
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.services.http_client import OPENALEX, UNPAYWALL
+
+logger = logging.getLogger(__name__)
+
+
+class DailyQuotaExceeded(Exception):
+    """Raised when a host's daily request quota has been used up."""
+
+
+class TokenBucket:
+    """
+    Async token bucket with an optional daily quota and Retry-After support.
+
+    `rate` tokens are added per second up to `burst`; acquire() waits until a
+    token is available. penalize() pauses the whole bucket, which is how a
+    429 Retry-After from the upstream is honored across all callers.
+    """
+
+    def __init__(self, name: str, rate: float, burst: int, daily_quota: int = 0):
+        self.name = name
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.daily_quota = daily_quota
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+        self._day = date.today()
+        self.used_today = 0
+        self.total_wait = 0.0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """Wait for a token. Raises DailyQuotaExceeded when the daily quota is used up."""
+        if self.rate <= 0:
+            return
+        # The lock makes waiters queue up in order instead of all polling the bucket
+        async with self._lock:
+            today = date.today()
+            if today != self._day:
+                self._day = today
+                self.used_today = 0
+            if self.daily_quota and self.used_today >= self.daily_quota:
+                raise DailyQuotaExceeded(f"Daily request quota of {self.daily_quota} reached for {self.name}")
+
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._refill(now)
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        self.used_today += 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+                self.total_wait += wait
+                await asyncio.sleep(wait)
+
+    def penalize(self, retry_after: float) -> None:
+        """Pause the bucket for retry_after seconds (e.g. from a 429 Retry-After header)."""
+        until = time.monotonic() + retry_after
+        if until > self._paused_until:
+            logger.warning(f"Rate limiter '{self.name}' paused for {retry_after:.1f}s")
+            self._paused_until = until
+            self._tokens = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "daily_quota": self.daily_quota,
+            "used_today": self.used_today,
+            "total_wait_seconds": round(self.total_wait, 3),
+            "paused_for_seconds": round(max(0.0, self._paused_until - time.monotonic()), 3),
+        }
+
+
+_buckets: Dict[str, TokenBucket] = {}
+
+
+def get_limiter(name: str) -> TokenBucket:
+    """Return the shared limiter for an upstream host, creating it on first use."""
+    bucket = _buckets.get(name)
+    if bucket is None:
+        if name == OPENALEX:
+            bucket = TokenBucket(
+                OPENALEX,
+                rate=settings.OPENALEX_RATE_PER_SECOND,
+                burst=settings.OPENALEX_RATE_BURST,
+                daily_quota=settings.OPENALEX_DAILY_QUOTA,
+            )
+        elif name == UNPAYWALL:
+            bucket = TokenBucket(
+                UNPAYWALL,
+                rate=settings.UNPAYWALL_RATE_PER_SECOND,
+                burst=settings.UNPAYWALL_RATE_BURST,
+                daily_quota=settings.UNPAYWALL_DAILY_QUOTA,
+            )
+        else:
+            raise ValueError(f"Unknown upstream limiter: {name}")
+        _buckets[name] = bucket
+    return bucket
+
+
+def parse_retry_after(value: Optional[str], default: float) -> float:
+    """Parse a Retry-After header given in seconds; fall back to default when absent or unparsable."""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return default
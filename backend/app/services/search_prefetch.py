@@ -0,0 +1,156 @@
+"""
+Speculative prefetch of the next /search/papers page.
+
+Reviewers page through results linearly. Once a session has turned at least
+SEARCH_PREFETCH_MIN_PAGES pages of the same search in order, serving page N
+starts a background fetch of page N+1 into the search cache, so the next click
+is a cache hit. A request for a page that is still being prefetched joins the
+in-flight fetch instead of issuing its own. Prefetches are bounded per user,
+and a user's prefetches for other searches are cancelled when they start a
+new one.
+"""
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Sessions remembered for pagination detection (least recently used are dropped)
+MAX_TRACKED_SESSIONS = 1000
+
+Window = Tuple[Hashable, int, int]  # (search key, offset, limit)
+
+
+class _Session:
+    __slots__ = ("search_key", "offset", "limit", "streak")
+
+    def __init__(self, search_key: Hashable, offset: int, limit: int):
+        self.search_key = search_key
+        self.offset = offset
+        self.limit = limit
+        self.streak = 0  # consecutive next-page requests for this search
+
+
+class SearchPrefetcher:
+    """Per-user pagination tracking and the background next-page fetches it triggers."""
+
+    def __init__(self):
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._tasks: Dict[str, "OrderedDict[Window, asyncio.Task]"] = {}
+        self.started = 0
+        self.used = 0
+        self.cancelled = 0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.SEARCH_PREFETCH_ENABLED and settings.SEARCH_PREFETCH_MAX_PER_USER > 0
+
+    async def fetch(self, user: str, window: Window, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Fetch a window, joining the user's in-flight prefetch of it when there is one.
+
+        Finished prefetches are not tracked here; their pages are already in the search cache.
+        """
+        task = self._tasks.get(user, {}).get(window)
+        if task is not None and not task.done():
+            self.used += 1
+            try:
+                # Shielded so a client disconnect doesn't cancel the shared prefetch
+                return await asyncio.shield(task)
+            except asyncio.CancelledError:
+                if not task.cancelled():
+                    raise
+            except Exception:
+                pass
+        return await fetch()
+
+    def record(self, user: str, search_key: Hashable, offset: int, limit: int) -> bool:
+        """
+        Record a page request and return whether the session is paginating.
+
+        Starting a different search resets the streak and cancels the user's
+        prefetches for other searches.
+        """
+        session = self._sessions.get(user)
+        if session is None or session.search_key != search_key:
+            if session is not None:
+                self._cancel(user, keep=search_key)
+            session = _Session(search_key, offset, limit)
+        elif offset == session.offset + session.limit and limit == session.limit:
+            session.streak += 1
+            session.offset = offset
+        else:
+            session.streak = 0
+            session.offset, session.limit = offset, limit
+
+        self._sessions[user] = session
+        self._sessions.move_to_end(user)
+        while len(self._sessions) > MAX_TRACKED_SESSIONS:
+            old_user, _ = self._sessions.popitem(last=False)
+            self._cancel(old_user)
+        return session.streak >= settings.SEARCH_PREFETCH_MIN_PAGES
+
+    def schedule(self, user: str, window: Window, fetch: Callable[[], Awaitable[Any]]) -> None:
+        """Start prefetching a window in the background, evicting the user's oldest prefetch if at the limit."""
+        tasks = self._tasks.setdefault(user, OrderedDict())
+        if window in tasks:
+            return
+        while len(tasks) >= settings.SEARCH_PREFETCH_MAX_PER_USER:
+            _, oldest = tasks.popitem(last=False)
+            if not oldest.done():
+                oldest.cancel()
+                self.cancelled += 1
+
+        async def run() -> Any:
+            try:
+                return await fetch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Search prefetch failed: {str(e)}")
+                raise
+
+        self.started += 1
+        task = asyncio.create_task(run())
+        tasks[window] = task
+
+        def forget(done: asyncio.Task) -> None:
+            # Finished prefetches have done their job by filling the search cache
+            if tasks.get(window) is done:
+                del tasks[window]
+                if not tasks:
+                    self._tasks.pop(user, None)
+            if not done.cancelled():
+                done.exception()  # Mark retrieved so failures aren't logged as unhandled
+
+        task.add_done_callback(forget)
+
+    def _cancel(self, user: str, keep: Optional[Hashable] = None) -> None:
+        tasks = self._tasks.get(user)
+        if not tasks:
+            return
+        for window, task in list(tasks.items()):
+            if window[0] != keep and not task.done():
+                task.cancel()
+                self.cancelled += 1
+
+    def cancel_all(self) -> None:
+        """Cancel every outstanding prefetch (called on shutdown)."""
+        for user in list(self._tasks):
+            self._cancel(user)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "tracked_sessions": len(self._sessions),
+            "in_flight": sum(len(t) for t in self._tasks.values()),
+            "started": self.started,
+            "joined_in_flight": self.used,
+            "cancelled": self.cancelled,
+        }
+
+
+search_prefetcher = SearchPrefetcher()
@@ -0,0 +1,162 @@
+"""
+Fuzzy matching of citation metadata (title, first author, year) against
+OpenAlex search candidates.
+
+Titles in reference lists rarely match OpenAlex exactly: capitalisation,
+punctuation, HTML markup, accents, dropped subtitles and typos all differ.
+Titles are normalised, then scored against every candidate with two
+complementary measures: token-set similarity (robust to word order and a
+missing subtitle) and character trigram similarity (robust to typos and
+hyphenation). Author surname and publication year are weighted in, and a
+candidate is only accepted if the combined score reaches DOI_MATCH_THRESHOLD.
+"""
+import re
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+# Weights of the combined score; signals missing from the query are left out and the rest rescaled
+TITLE_WEIGHT = 0.7
+AUTHOR_WEIGHT = 0.2
+YEAR_WEIGHT = 0.1
+
+# Year score for an off-by-one year (online-first vs. issue date, preprint vs. version of record)
+ADJACENT_YEAR_SCORE = 0.5
+# Surname score when the author is on the paper but not first
+CO_AUTHOR_SCORE = 0.8
+
+NGRAM_SIZE = 3
+
+_TAGS = re.compile(r"<[^>]+>")
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def normalize_title(title: str) -> str:
+    """Lower-case, strip markup, accents and punctuation, and collapse whitespace."""
+    if not title:
+        return ""
+    text = _TAGS.sub(" ", title)
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(_NON_WORD.sub(" ", text.lower()).split())
+
+
+def _ngrams(text: str) -> Counter:
+    padded = f" {text} "
+    return Counter(padded[i:i + NGRAM_SIZE] for i in range(max(len(padded) - NGRAM_SIZE + 1, 1)))
+
+
+def ngram_similarity(a: Counter, b: Counter) -> float:
+    """Dice coefficient of two character n-gram multisets."""
+    total = sum(a.values()) + sum(b.values())
+    return 2 * sum((a & b).values()) / total if total else 0.0
+
+
+def token_set_similarity(a: frozenset, b: frozenset) -> float:
+    """
+    Mean of the Dice coefficient and the containment of the smaller token set.
+
+    Containment keeps a title that lost its subtitle close to 1; Dice stops a
+    short generic title from matching every longer title that contains it.
+    """
+    if not a or not b:
+        return 0.0
+    common = len(a & b)
+    return (2 * common / (len(a) + len(b)) + common / min(len(a), len(b))) / 2
+
+
+class _Features:
+    __slots__ = ("tokens", "ngrams")
+
+    def __init__(self, normalized: str):
+        self.tokens = frozenset(normalized.split())
+        self.ngrams = _ngrams(normalized)
+
+
+def _surname(name: str) -> str:
+    parts = normalize_title(name).split()
+    return parts[-1] if parts else ""
+
+
+def _author_score(surname: str, authors: List[Dict[str, Any]]) -> float:
+    """1 if the surname is the first author's, CO_AUTHOR_SCORE for a co-author, else fuzzy similarity."""
+    surnames = [_surname(a.get("name") or "") for a in authors or []]
+    if not any(surnames):
+        return 0.0
+    if surnames[0] == surname:
+        return 1.0
+    if surname in surnames:
+        return CO_AUTHOR_SCORE
+    # Transliteration and typos: best trigram similarity, kept below an exact co-author hit
+    query = _ngrams(surname)
+    return CO_AUTHOR_SCORE * max(ngram_similarity(query, _ngrams(s)) for s in surnames if s)
+
+
+def _year_score(year: int, publication_date: Optional[str]) -> float:
+    try:
+        candidate_year = int(str(publication_date)[:4])
+    except (TypeError, ValueError):
+        return 0.0
+    difference = abs(candidate_year - year)
+    if difference == 0:
+        return 1.0
+    return ADJACENT_YEAR_SCORE if difference == 1 else 0.0
+
+
+def score_candidates(
+    title: str,
+    candidates: List[Dict[str, Any]],
+    author: Optional[str] = None,
+    year: Optional[int] = None
+) -> List[Tuple[float, Dict[str, Any]]]:
+    """
+    Score every candidate paper against the citation in one pass.
+
+    The query's features are computed once and reused for all candidates.
+
+    Args:
+        title: Title from the citation
+        candidates: Paper dicts as returned by search_papers_direct
+        author: Surname of the first author, if known
+        year: Publication year, if known
+
+    Returns:
+        (score in [0, 1], candidate) pairs, best first
+    """
+    query = _Features(normalize_title(title))
+    surname = _surname(author) if author else ""
+
+    weights = TITLE_WEIGHT + (AUTHOR_WEIGHT if surname else 0) + (YEAR_WEIGHT if year else 0)
+    scored = []
+    for candidate in candidates:
+        features = _Features(normalize_title(candidate.get("title") or ""))
+        title_score = (
+            token_set_similarity(query.tokens, features.tokens)
+            + ngram_similarity(query.ngrams, features.ngrams)
+        ) / 2
+        score = TITLE_WEIGHT * title_score
+        if surname:
+            score += AUTHOR_WEIGHT * _author_score(surname, candidate.get("authors") or [])
+        if year:
+            score += YEAR_WEIGHT * _year_score(year, candidate.get("publication_date"))
+        scored.append((score / weights, candidate))
+
+    scored.sort(key=lambda pair: pair[0], reverse=True)
+    return scored
+
+
+def best_match(
+    title: str,
+    candidates: List[Dict[str, Any]],
+    author: Optional[str] = None,
+    year: Optional[int] = None,
+    threshold: Optional[float] = None
+) -> Optional[Tuple[float, Dict[str, Any]]]:
+    """Return the best-scoring (score, candidate) with a DOI, or None if it is below the threshold."""
+    threshold = settings.DOI_MATCH_THRESHOLD if threshold is None else threshold
+    for score, candidate in score_candidates(title, candidates, author, year):
+        if candidate.get("doi"):
+            return (score, candidate) if score >= threshold else None
+    return None
@@ -0,0 +1,144 @@
+"""
+Persistent cache of Unpaywall lookup results, with negative caching.
+
+Most DOIs in a review have no open access copy, and Unpaywall gives the same
+answer for them every time. Both positive results and negative ones (404
+unknown DOI, 422 invalid DOI, or found but not OA) are stored; negative
+answers get their own, longer TTL (UNPAYWALL_NEGATIVE_CACHE_TTL_DAYS).
+Transient errors (5xx, timeouts, rate limits) are never cached.
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+
+from app.core.config import settings
+from app.db.bulk import select_in, upsert_row
+from app.db.session import SessionLocal
+from app.models.unpaywall_record import UnpaywallRecord
+
+logger = logging.getLogger(__name__)
+
+# Upstream statuses that are answers about the DOI rather than failures
+NEGATIVE_STATUS_CODES = {404, 422}
+
+_counters = {"hits": 0, "negative_hits": 0, "misses": 0, "stale_served": 0, "stored": 0}
+
+
+def classify(data: Dict[str, Any]) -> Optional[bool]:
+    """
+    Decide whether a get_unpaywall_data result can be cached.
+
+    Returns:
+        False for a positive (OA) result, True for a negative one, None if it must not be cached
+    """
+    if "error" in data:
+        return True if data.get("status_code") in NEGATIVE_STATUS_CODES else None
+    return not data.get("is_open_access")
+
+
+def is_fresh(fetched_at: datetime, is_negative: bool) -> bool:
+    days = settings.UNPAYWALL_NEGATIVE_CACHE_TTL_DAYS if is_negative else settings.UNPAYWALL_CACHE_TTL_DAYS
+    return datetime.utcnow() - fetched_at < timedelta(days=days)
+
+
+def get_many(dois: List[str]) -> Dict[str, Tuple[Dict[str, Any], datetime, bool]]:
+    """
+    Get cached results for lower-cased DOIs.
+
+    Returns:
+        Mapping of DOI to (result, fetched_at, is_negative) for every cached DOI, fresh or not
+    """
+    if not settings.UNPAYWALL_CACHE_ENABLED or not dois:
+        return {}
+
+    db = SessionLocal()
+    try:
+        return {
+            row["doi"]: (row["data"], row["fetched_at"], row["is_negative"])
+            for row in select_in(db, UnpaywallRecord.__table__.c.doi, dois)
+        }
+    except Exception as e:
+        logger.error(f"Error reading Unpaywall cache: {str(e)}")
+        return {}
+    finally:
+        db.close()
+
+
+def get(doi: str) -> Optional[Tuple[Dict[str, Any], datetime, bool]]:
+    """Get the cached (result, fetched_at, is_negative) for a lower-cased DOI, if any."""
+    return get_many([doi]).get(doi)
+
+
+def record_lookup(entry: Optional[Tuple[Dict[str, Any], datetime, bool]]) -> bool:
+    """Count a cache lookup; returns True if the entry is fresh enough to serve."""
+    if entry is not None and is_fresh(entry[1], entry[2]):
+        _counters["negative_hits" if entry[2] else "hits"] += 1
+        return True
+    _counters["misses"] += 1
+    return False
+
+
+def record_stale_served() -> None:
+    _counters["stale_served"] += 1
+
+
+def put_many(results: List[Tuple[str, Dict[str, Any]]]) -> None:
+    """
+    Store cacheable results (see classify); anything else is ignored.
+
+    Args:
+        results: (lower-cased DOI, get_unpaywall_data result) pairs
+    """
+    if not settings.UNPAYWALL_CACHE_ENABLED:
+        return
+    cacheable = [(doi, data, classify(data)) for doi, data in results]
+    cacheable = [(doi, data, negative) for doi, data, negative in cacheable if negative is not None]
+    if not cacheable:
+        return
+
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        for doi, data, negative in cacheable:
+            upsert_row(
+                db, UnpaywallRecord, [(UnpaywallRecord.doi, doi)],
+                {"data": data, "is_negative": negative, "fetched_at": now}
+            )
+        db.commit()
+        _counters["stored"] += len(cacheable)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error writing Unpaywall cache: {str(e)}")
+    finally:
+        db.close()
+
+
+def put(doi: str, data: Dict[str, Any]) -> None:
+    put_many([(doi, data)])
+
+
+def stats() -> Dict[str, Any]:
+    """Lookup counters since startup plus the number of stored positive and negative entries."""
+    lookups = _counters["hits"] + _counters["negative_hits"] + _counters["misses"]
+    result: Dict[str, Any] = {
+        "enabled": settings.UNPAYWALL_CACHE_ENABLED,
+        "ttl_days": settings.UNPAYWALL_CACHE_TTL_DAYS,
+        "negative_ttl_days": settings.UNPAYWALL_NEGATIVE_CACHE_TTL_DAYS,
+        **_counters,
+        "hit_ratio": round((_counters["hits"] + _counters["negative_hits"]) / lookups, 4) if lookups else 0.0,
+    }
+    db = SessionLocal()
+    try:
+        counts = dict(
+            db.query(UnpaywallRecord.is_negative, func.count(UnpaywallRecord.id))
+            .group_by(UnpaywallRecord.is_negative).all()
+        )
+        result["stored_positive"] = counts.get(False, 0)
+        result["stored_negative"] = counts.get(True, 0)
+    except Exception as e:
+        logger.error(f"Error counting Unpaywall cache entries: {str(e)}")
+    finally:
+        db.close()
+    return result
@@ -3,69 +3,219 @@ Unpaywall Client for PDF lookup.
 This module provides async functions to fetch open access availability data from Unpaywall.
 """
 
+import asyncio
 import httpx
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator, Iterable, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
 
 from app.core.config import settings
+from app.services.http_client import get_unpaywall_client, UNPAYWALL
+from app.services.rate_limit import get_limiter, parse_retry_after
+from app.services.singleflight import SingleFlight
+from app.services import latency
+from app.services.circuit_breaker import get_breaker
+from app.services import unpaywall_cache
+from app.services.unpaywall_snapshot import get_local_record, get_local_records
 
 # Get Unpaywall email from settings
 UNPAYWALL_EMAIL = settings.UNPAYWALL_EMAIL
 
 logger = logging.getLogger(__name__)
 
+# Concurrent lookups of the same DOI share one upstream request
+unpaywall_lookups = SingleFlight("unpaywall_doi")
+
+def format_unpaywall_record(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a raw Unpaywall record (API response or snapshot line) into the result format used across the app."""
+    # Extract authors from z_authors if available
+    authors = []
+    if data.get('z_authors'):
+        for author in data['z_authors']:
+            name = f"{author.get('given', '')} {author.get('family', '')}".strip()
+            authors.append({"name": name, "affiliation": None})
+    
+    # Find best open access URL
+    is_open_access = data.get('is_oa', False)
+    open_access_url = None
+    
+    if is_open_access and data.get('best_oa_location'):
+        oa_location = data['best_oa_location']
+        if oa_location.get('url_for_pdf'):
+            open_access_url = oa_location['url_for_pdf']
+        elif oa_location.get('url'):
+            open_access_url = oa_location['url']
+    
+    return {
+        "doi": data.get('doi'),
+        "title": data.get('title', ''),
+        "authors": authors,
+        "publication_date": data.get('published_date'),
+        "journal": data.get('journal_name'),
+        "publisher": data.get('publisher'),
+        "is_open_access": is_open_access,
+        "open_access_url": open_access_url,
+        "oa_status": data.get('oa_status'),
+        "journal_is_oa": data.get('journal_is_oa', False),
+        "journal_issns": data.get('journal_issns'),
+        "best_oa_location": data.get('best_oa_location'),
+        "url": data.get('doi_url'),
+        "source": "Unpaywall"
+    }
+
 async def get_unpaywall_data(doi: str = "10.1038/nature12373") -> Dict[str, Any]:
-    """Get open access information for a paper using the Unpaywall API"""
+    """
+    Get open access information for a paper using the Unpaywall API.
+    
+    DOIs imported from an Unpaywall snapshot are answered locally. Otherwise
+    answers are served from the persistent Unpaywall cache while fresh,
+    including negative ones (unknown DOI, no OA copy). A stale entry is still
+    served if refreshing it fails. The SQLite reads and writes run in the
+    threadpool so they never stall the event loop.
+    """
+    key = doi.strip().lower()
+    local = await run_in_threadpool(get_local_record, key)
+    if local is not None:
+        return local
+    
+    cached = await run_in_threadpool(unpaywall_cache.get, key)
+    if unpaywall_cache.record_lookup(cached):
+        return cached[0]
+    return await _lookup(key, cached)
+
+async def _lookup(key: str, cached: Optional[Tuple[Dict[str, Any], Any, bool]]) -> Dict[str, Any]:
+    """Fetch a DOI that missed the cache (coalesced), store the answer, and fall back to a stale entry on failure."""
+    async def fetch_and_store() -> Dict[str, Any]:
+        data = await _fetch_unpaywall_data(key)
+        await run_in_threadpool(unpaywall_cache.put, key, data)
+        return data
     
-    url = f"https://api.unpaywall.org/v2/{doi}"
+    return _serve_stale(key, await unpaywall_lookups.do(key, fetch_and_store), cached)
+
+def _serve_stale(key: str, data: Dict[str, Any], cached: Optional[Tuple[Dict[str, Any], Any, bool]]) -> Dict[str, Any]:
+    """Replace a failed (uncacheable) answer with the stale cached one, if there is one."""
+    if "error" in data and cached is not None and unpaywall_cache.classify(data) is None:
+        logger.info(f"Serving cached Unpaywall answer for DOI {key} after failed refresh")
+        unpaywall_cache.record_stale_served()
+        return cached[0]
+    return data
+
+async def get_unpaywall_data_many(
+    dois: Iterable[str],
+    concurrency: Optional[int] = None
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Look up many DOIs on Unpaywall, yielding (DOI, result) pairs as they complete.
+    
+    Snapshot-imported and cached answers are read in bulk (in the threadpool,
+    so the event loop is not blocked) and yielded first. The rest are fetched
+    by a fixed pool of `concurrency` workers on the shared pooled client, so
+    the per-host rate limiter and connection limits apply across all of them,
+    and the fetched answers are written to the cache in one put_many.
+    Results are in completion order, not input order; DOIs are lower-cased
+    and duplicates are looked up once. Stopping iteration early cancels the
+    outstanding lookups.
+    
+    Args:
+        dois: DOIs to look up
+        concurrency: Maximum lookups in flight (default UNPAYWALL_BATCH_CONCURRENCY)
+    """
+    keys = list(dict.fromkeys(k for k in (d.strip().lower() for d in dois if d) if k))
+    if not keys:
+        return
+    
+    local = await run_in_threadpool(get_local_records, keys)
+    for key, data in local.items():
+        yield key, data
+    keys = [key for key in keys if key not in local]
+    
+    cached = await run_in_threadpool(unpaywall_cache.get_many, keys)
+    to_fetch: List[str] = []
+    for key in keys:
+        entry = cached.get(key)
+        if unpaywall_cache.record_lookup(entry):
+            yield key, entry[0]
+        else:
+            to_fetch.append(key)
+    if not to_fetch:
+        return
+    
+    workers_count = max(1, min(concurrency or settings.UNPAYWALL_BATCH_CONCURRENCY, len(to_fetch)))
+    logger.info(f"Unpaywall bulk lookup: {len(keys) - len(to_fetch)} cached, "
+                f"fetching {len(to_fetch)} with {workers_count} workers")
+    
+    pending = iter(to_fetch)
+    results: asyncio.Queue = asyncio.Queue()
+    fetched: List[Tuple[str, Dict[str, Any]]] = []
+    
+    async def worker() -> None:
+        for key in pending:
+            try:
+                # Coalesced with single lookups of the same DOI; stored below with the rest
+                data = await unpaywall_lookups.do(key, lambda: _fetch_unpaywall_data(key))
+                fetched.append((key, data))
+                data = _serve_stale(key, data, cached.get(key))
+            except Exception as e:
+                logger.error(f"Error in Unpaywall bulk lookup for {key}: {str(e)}")
+                data = {"error": str(e), "doi": key}
+            await results.put((key, data))
+    
+    workers = [asyncio.create_task(worker()) for _ in range(workers_count)]
+    try:
+        for _ in range(len(to_fetch)):
+            yield await results.get()
+    finally:
+        for task in workers:
+            task.cancel()
+        if fetched:
+            await run_in_threadpool(unpaywall_cache.put_many, fetched)
+
+async def _fetch_unpaywall_data(doi: str) -> Dict[str, Any]:
+    """Query Unpaywall for one DOI, bypassing request coalescing."""
+    url = f"/v2/{doi}"
     
     params = {
         "email": UNPAYWALL_EMAIL
     }
     
+    breaker = get_breaker(UNPAYWALL)
+    if not breaker.allow():
+        logger.warning(f"Unpaywall circuit breaker open; skipping lookup for {doi}")
+        return {"error": "Unpaywall temporarily unavailable", "doi": doi}
+    
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(url, params=params)
-            
-            if response.status_code == 200:
-                data = response.json()
-                
-                # Extract authors from z_authors if available
-                authors = []
-                if data.get('z_authors'):
-                    for author in data['z_authors']:
-                        name = f"{author.get('given', '')} {author.get('family', '')}".strip()
-                        authors.append({"name": name, "affiliation": None})
-                
-                # Find best open access URL
-                is_open_access = data.get('is_oa', False)
-                open_access_url = None
-                
-                if is_open_access and data.get('best_oa_location'):
-                    oa_location = data['best_oa_location']
-                    if oa_location.get('url_for_pdf'):
-                        open_access_url = oa_location['url_for_pdf']
-                    elif oa_location.get('url'):
-                        open_access_url = oa_location['url']
-                
-                result = {
-                    "doi": data.get('doi'),
-                    "title": data.get('title', ''),
-                    "authors": authors,
-                    "publication_date": data.get('published_date'),
-                    "journal": data.get('journal_name'),
-                    "publisher": data.get('publisher'),
-                    "is_open_access": is_open_access,
-                    "open_access_url": open_access_url,
-                    "url": data.get('doi_url'),
-                    "source": "Unpaywall"
-                }
-                
-                return result
-            else:
-                logger.error(f"Unpaywall API error: HTTP {response.status_code}")
-                return {"error": f"HTTP {response.status_code}", "doi": doi}
+        client = get_unpaywall_client()
+        limiter = get_limiter(UNPAYWALL)
+        tracker = latency.get_tracker(latency.UNPAYWALL_LOOKUP)
+        
+        async def send() -> httpx.Response:
+            await limiter.acquire()
+            return await latency.timed_call(
+                tracker, tracker.timeout(settings.UNPAYWALL_TIMEOUT),
+                lambda timeout: client.get(url, params=params, timeout=timeout)
+            )
+        
+        # Slow lookups are hedged with a duplicate request after the observed p95
+        response = await latency.hedged(tracker, send)
+        
+        if response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        
+        if response.status_code == 429:
+            # Hold back every Unpaywall caller until the upstream lets us in again
+            limiter.penalize(parse_retry_after(response.headers.get("Retry-After"), 1.0))
+        
+        if response.status_code == 200:
+            return format_unpaywall_record(response.json())
+        else:
+            logger.error(f"Unpaywall API error: HTTP {response.status_code}")
+            return {"error": f"HTTP {response.status_code}", "doi": doi, "status_code": response.status_code}
     
     except Exception as e:
+        if isinstance(e, httpx.TransportError):
+            breaker.record_failure()
         logger.error(f"Error fetching Unpaywall data: {str(e)}")
         return {"error": str(e), "doi": doi}
@@ -0,0 +1,137 @@
+"""
+Local Unpaywall data imported from an offline snapshot.
+
+Unpaywall publishes its full dataset as a gzipped JSON-lines snapshot. The
+importer streams it (optionally keeping only DOIs from an allowlist or
+journals with given ISSNs) into the indexed unpaywall_local table. Unpaywall
+lookups (get_unpaywall_data and everything built on it) and PDF URL
+resolution consult this table before going to the network, so OA resolution
+for DOIs covered by the snapshot runs entirely offline.
+"""
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.db.bulk import insert_or_replace, select_in
+from app.db.session import engine as default_engine
+from app.models.unpaywall_local import LocalUnpaywallRecord
+from app.services.local_index import iter_snapshot_lines
+from app.services.openalex_records import decode_json
+
+logger = logging.getLogger(__name__)
+
+
+def _record_issns(record: Dict[str, Any]) -> set:
+    issns = set()
+    if record.get("journal_issn_l"):
+        issns.add(record["journal_issn_l"].upper())
+    for issn in (record.get("journal_issns") or "").split(","):
+        if issn.strip():
+            issns.add(issn.strip().upper())
+    return issns
+
+
+def load_doi_allowlist(path: str) -> set:
+    """Read a DOI allowlist file (one DOI per line; resolver prefixes are stripped)."""
+    # Imported here to keep this module free of the OpenAlex client at import time
+    from app.services.openalex_direct import normalize_doi
+
+    with open(path, "r", encoding="utf-8") as fh:
+        return {d for d in (normalize_doi(line) for line in fh) if d}
+
+
+def ingest_snapshot(
+    path: str,
+    dois: Optional[Iterable[str]] = None,
+    issns: Optional[Iterable[str]] = None,
+    batch_size: int = 5000,
+    engine: Engine = default_engine
+) -> Dict[str, int]:
+    """
+    Stream an Unpaywall snapshot into the local table.
+
+    Lines are decoded one at a time and rows are bulk-inserted in batches, so
+    memory use is bounded by batch_size regardless of snapshot size.
+
+    Args:
+        path: Snapshot .jsonl(.gz) file, or a directory of .gz files
+        dois: Only keep these DOIs (lower-cased, bare)
+        issns: Only keep records from journals with one of these ISSNs
+        batch_size: Rows per bulk insert
+
+    Returns:
+        Counts of lines read, records matched, rows written and lines skipped as invalid
+    """
+    from app.services.unpaywall_client import format_unpaywall_record
+
+    allowlist = set(dois) if dois else None
+    issn_filter = {i.strip().upper() for i in issns} if issns else None
+    LocalUnpaywallRecord.__table__.create(bind=engine, checkfirst=True)
+
+    stats = {"read": 0, "matched": 0, "written": 0, "invalid": 0}
+    rows: List[Dict[str, Any]] = []
+    now = datetime.utcnow()
+
+    def flush() -> None:
+        if not rows:
+            return
+        with engine.begin() as conn:
+            # Importing a newer snapshot replaces records in place
+            insert_or_replace(conn, LocalUnpaywallRecord.__table__, rows)
+        stats["written"] += len(rows)
+        rows.clear()
+        logger.info(f"Unpaywall snapshot import: {stats['read']} read, {stats['written']} written")
+
+    for line in iter_snapshot_lines(path):
+        stats["read"] += 1
+        try:
+            record = decode_json(line)
+            doi = (record.get("doi") or "").strip().lower()
+            if not doi:
+                raise ValueError("missing doi")
+        except Exception as e:
+            stats["invalid"] += 1
+            logger.debug(f"Skipping invalid snapshot line: {e}")
+            continue
+
+        if allowlist is not None and doi not in allowlist:
+            continue
+        if issn_filter is not None and not (_record_issns(record) & issn_filter):
+            continue
+
+        stats["matched"] += 1
+        rows.append({
+            "doi": doi,
+            "is_oa": bool(record.get("is_oa")),
+            "oa_status": record.get("oa_status"),
+            "journal_issn_l": record.get("journal_issn_l"),
+            "data": format_unpaywall_record(record),
+            "ingested_at": now,
+        })
+        if len(rows) >= batch_size:
+            flush()
+
+    flush()
+    logger.info(f"Unpaywall snapshot import complete: {stats}")
+    return stats
+
+
+def get_local_records(dois: List[str], engine: Engine = default_engine) -> Dict[str, Dict[str, Any]]:
+    """Get imported Unpaywall results for lower-cased DOIs, keyed by DOI."""
+    if not settings.UNPAYWALL_LOCAL_ENABLED or not dois:
+        return {}
+    found: Dict[str, Dict[str, Any]] = {}
+    try:
+        with engine.connect() as conn:
+            for row in select_in(conn, LocalUnpaywallRecord.__table__.c.doi, dois):
+                found[row["doi"]] = row["data"]
+    except Exception as e:
+        logger.error(f"Error reading local Unpaywall table: {str(e)}")
+    return found
+
+
+def get_local_record(doi: str) -> Optional[Dict[str, Any]]:
+    return get_local_records([doi]).get(doi)
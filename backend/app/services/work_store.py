@@ -0,0 +1,86 @@
+"""
+Persistent local store of formatted OpenAlex work records.
+
+OpenAlex lookups check this store before going to the network, so metadata
+we have already fetched survives server restarts. Records older than
+WORK_STORE_MAX_AGE_DAYS are revalidated against OpenAlex, but are still
+served if revalidation fails.
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+
+from app.core.config import settings
+from app.db.bulk import select_in, upsert_row
+from app.db.session import SessionLocal
+from app.models.openalex_work import OpenAlexWork
+
+logger = logging.getLogger(__name__)
+
+
+def _max_age() -> timedelta:
+    return timedelta(days=settings.WORK_STORE_MAX_AGE_DAYS)
+
+
+def is_fresh(fetched_at: datetime) -> bool:
+    """Whether a record fetched at this time can be served without revalidation."""
+    return datetime.utcnow() - fetched_at < _max_age()
+
+
+def get_works_by_dois(dois: List[str]) -> Dict[str, Tuple[Dict[str, Any], datetime]]:
+    """
+    Get stored records for normalized DOIs.
+    
+    Returns:
+        Mapping of DOI to (formatted record, fetched_at) for every DOI in the store,
+        fresh or not
+    """
+    if not settings.WORK_STORE_ENABLED or not dois:
+        return {}
+    
+    db = SessionLocal()
+    try:
+        return {
+            row["doi"]: (row["data"], row["fetched_at"])
+            for row in select_in(db, OpenAlexWork.__table__.c.doi, dois)
+        }
+    except Exception as e:
+        logger.error(f"Error reading OpenAlex work store: {str(e)}")
+        return {}
+    finally:
+        db.close()
+
+
+def get_work_by_doi(doi: str) -> Optional[Tuple[Dict[str, Any], datetime]]:
+    """Get the stored (formatted record, fetched_at) for a normalized DOI, if any."""
+    return get_works_by_dois([doi]).get(doi)
+
+
+def put_works(works: List[Tuple[Optional[str], Dict[str, Any]]]) -> None:
+    """
+    Insert or refresh formatted records.
+    
+    Args:
+        works: (normalized DOI, formatted record) pairs
+    """
+    if not settings.WORK_STORE_ENABLED or not works:
+        return
+    
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        for doi, data in works:
+            openalex_id = data.get("openalex_id")
+            if not doi and not openalex_id:
+                continue
+            upsert_row(
+                db, OpenAlexWork,
+                [(OpenAlexWork.openalex_id, openalex_id), (OpenAlexWork.doi, doi)],
+                {"data": data, "fetched_at": now}
+            )
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error writing OpenAlex work store: {str(e)}")
+    finally:
+        db.close()
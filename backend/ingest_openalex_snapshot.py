@@ -0,0 +1,18 @@
+import argparse
+import logging
+
+from app.services.local_index import ingest_snapshot
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load an OpenAlex works snapshot into the local search index.")
+    parser.add_argument("path", help="Snapshot .gz file or directory (e.g. openalex-snapshot/data/works)")
+    parser.add_argument("--concept", action="append", default=[], help="Only keep works with this concept ID (repeatable)")
+    parser.add_argument("--source", action="append", default=[], help="Only keep works from this source ID (repeatable)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Rows per bulk insert")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    print(f"Ingesting OpenAlex snapshot from {args.path}...")
+    stats = ingest_snapshot(args.path, concept_ids=args.concept, source_ids=args.source, batch_size=args.batch_size)
+    print(f"Done: {stats['read']} lines read, {stats['matched']} works matched, "
+          f"{stats['written']} written, {stats['invalid']} invalid.")
@@ -0,0 +1,19 @@
+import argparse
+import logging
+
+from app.services.unpaywall_snapshot import ingest_snapshot, load_doi_allowlist
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load an Unpaywall data snapshot into the local OA lookup table.")
+    parser.add_argument("path", help="Snapshot .jsonl.gz file (or a directory of .gz files)")
+    parser.add_argument("--doi-file", help="Only keep DOIs listed in this file (one per line)")
+    parser.add_argument("--issn", action="append", default=[], help="Only keep records from journals with this ISSN (repeatable)")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Rows per bulk insert")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    dois = load_doi_allowlist(args.doi_file) if args.doi_file else None
+    print(f"Importing Unpaywall snapshot from {args.path}...")
+    stats = ingest_snapshot(args.path, dois=dois, issns=args.issn, batch_size=args.batch_size)
+    print(f"Done: {stats['read']} lines read, {stats['matched']} records matched, "
+          f"{stats['written']} written, {stats['invalid']} invalid.")
@@ -8,6 +8,8 @@ import logging
 from app.api.api import api_router
 from app.core.config import settings
 from app.db.init_db import init_db
+from app.services.http_client import init_http_clients, close_http_clients
+from app.services.search_prefetch import search_prefetcher
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +34,13 @@ def on_startup():
     logger.info("Running database initialization on startup...")
     init_db()
     logger.info("Database initialization complete.")
+    init_http_clients()
+
+# Release pooled upstream connections on shutdown
+@app.on_event("shutdown")
+async def on_shutdown():
+    search_prefetcher.cancel_all()
+    await close_http_clients()
 
 # Add validation error handler
 @app.exception_handler(RequestValidationError)
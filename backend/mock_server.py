@@ -0,0 +1,270 @@
+"""
+Local stand-in for the OpenAlex and Unpaywall APIs, for offline load testing.
+
+Serves deterministic synthetic works for the endpoints the app calls:
+/works (search, doi:a|b filters, cursor paging, group_by), /works/{id},
+/works/doi:{doi}, /autocomplete/{entity} and Unpaywall's /v2/{doi}.
+Latency, 429 injection and payload size are configured with MOCK_*
+environment variables (see MockSettings).
+
+Search hits are built from the query (the top hit usually carries the
+searched title, year and author; lower hits are perturbed variants), so
+DOI matching and the batch DOI finder can be exercised end to end. A work is
+seeded by its DOI, so looking up a search hit's DOI on /works/doi:{doi} or
+/v2/{doi} returns the same work and OA status.
+
+Run it and point the app at it:
+    uvicorn mock_server:app --port 8001
+    OPENALEX_BASE_URL=http://127.0.0.1:8001 UNPAYWALL_BASE_URL=http://127.0.0.1:8001 uvicorn main:app
+"""
+import asyncio
+import hashlib
+import random
+import re
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from pydantic_settings import BaseSettings
+
+
+class MockSettings(BaseSettings):
+    LATENCY_MS: float = 50.0  # base latency added to every response
+    LATENCY_JITTER_MS: float = 20.0  # uniform random extra latency
+    RATE_429: float = 0.0  # fraction of requests answered with 429
+    RETRY_AFTER: int = 1  # Retry-After seconds sent with injected 429s
+    NOT_FOUND_RATE: float = 0.0  # fraction of DOIs that neither API knows
+    OA_RATE: float = 0.5  # fraction of works that are open access
+    MATCH_RATE: float = 0.9  # fraction of searches whose top hit carries the searched title
+    TOTAL_RESULTS: int = 5000  # result count reported for any search
+    ABSTRACT_WORDS: int = 200  # payload size: words per abstract
+    AUTHORS_PER_WORK: int = 5  # payload size: authorships per work
+    CONCEPTS_PER_WORK: int = 8  # payload size: concepts per work
+    SEED: int = 0
+
+    class Config:
+        env_prefix = "MOCK_"
+
+
+mock_settings = MockSettings()
+app = FastAPI(title="OpenAlex/Unpaywall mock")
+_rng = random.Random(mock_settings.SEED)
+
+# Titles/years/authors given to search hits, so DOI lookups of a hit return the same work
+MAX_REMEMBERED_HITS = 100000
+_search_hits: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+WORDS = [
+    "analysis", "effect", "model", "study", "data", "learning", "network", "review", "clinical", "trial",
+    "social", "media", "health", "policy", "survey", "method", "outcome", "risk", "cohort", "evidence",
+]
+
+
+def _seeded(key: str) -> random.Random:
+    digest = hashlib.sha1(f"{mock_settings.SEED}:{key}".encode()).hexdigest()
+    return random.Random(int(digest[:16], 16))
+
+
+def _known(doi: str) -> bool:
+    return _seeded("found:" + doi).random() >= mock_settings.NOT_FOUND_RATE
+
+
+def _work_index(doi: str) -> int:
+    """Plain listing DOIs (10.5555/mock.N) map to W{N}; any other DOI to a stable hash."""
+    match = re.fullmatch(r"10\.5555/mock\.(\d+)", doi)
+    return int(match.group(1)) if match else int(hashlib.sha1(doi.encode()).hexdigest()[:8], 16)
+
+
+def _work(doi: str) -> Dict[str, Any]:
+    """Build a synthetic OpenAlex work; the same DOI always yields the same work."""
+    rng = _seeded(doi)
+    index = _work_index(doi)
+    hit = _search_hits.get(doi) or {}
+    year = hit.get("year") or rng.randint(1990, 2024)
+    abstract_index: Dict[str, List[int]] = {}
+    for position in range(mock_settings.ABSTRACT_WORDS):
+        abstract_index.setdefault(rng.choice(WORDS), []).append(position)
+    is_oa = rng.random() < mock_settings.OA_RATE
+    source_id = rng.randint(1, 50)
+    authorships = [
+        {
+            "author": {"id": f"https://openalex.org/A{rng.randint(1, 10 ** 6)}",
+                       "display_name": f"Author {rng.randint(1, 10 ** 4)}"},
+            "institutions": [{"display_name": f"University {rng.randint(1, 200)}"}],
+        }
+        for _ in range(mock_settings.AUTHORS_PER_WORK)
+    ]
+    if hit.get("author") and authorships:
+        authorships[0]["author"]["display_name"] = hit["author"]
+    title = " ".join(rng.choice(WORDS) for _ in range(8)).capitalize()
+    return {
+        "id": f"https://openalex.org/W{index}",
+        "doi": f"https://doi.org/{doi}",
+        "title": hit.get("title") or title,
+        "publication_year": year,
+        "publication_date": f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "authorships": authorships,
+        "abstract_inverted_index": abstract_index,
+        "primary_location": {"source": {
+            "id": f"https://openalex.org/S{source_id}",
+            "display_name": f"Journal of Mock Studies {source_id}",
+            "host_organization_name": "Mock Publisher",
+        }},
+        "best_oa_location": {
+            "is_oa": is_oa,
+            "landing_page_url": f"https://mock.example/landing/{index}" if is_oa else None,
+            "pdf_url": f"https://mock.example/pdf/{index}.pdf" if is_oa else None,
+        },
+        "biblio": {"volume": str(rng.randint(1, 60)), "issue": str(rng.randint(1, 12)),
+                   "first_page": "1", "last_page": str(rng.randint(5, 30))},
+        "cited_by_count": rng.randint(0, 5000),
+        "referenced_works_count": rng.randint(0, 120),
+        "concepts": [
+            {"id": f"https://openalex.org/C{rng.randint(1, 500)}", "display_name": rng.choice(WORDS).capitalize()}
+            for _ in range(mock_settings.CONCEPTS_PER_WORK)
+        ],
+    }
+
+
+def _search_filters(filter: Optional[str]) -> Dict[str, Any]:
+    """Pull the year range and author name out of an OpenAlex filter string."""
+    found: Dict[str, Any] = {}
+    for part in (filter or "").split(","):
+        key, _, value = part.partition(":")
+        if key == "publication_year" and value[:1] in "<>" and value[1:].isdigit():
+            found["year_to" if value[0] == "<" else "year_from"] = int(value[1:]) + (-1 if value[0] == "<" else 1)
+        elif key in ("authorships.author.display_name.search", "raw_author_name.search"):
+            found["author"] = value
+    return found
+
+
+def _search_hit(search: str, filters: Dict[str, Any], rank: int) -> str:
+    """
+    Register the search hit at a rank and return its DOI.
+
+    The top hit carries the searched title verbatim (for MATCH_RATE of
+    queries), the filtered author as first author and a year in the filtered
+    range; lower hits get reworded titles so matching has near-misses to reject.
+    """
+    scope = hashlib.sha1(f"{search}|{sorted(filters.items())}".encode()).hexdigest()[:10]
+    doi = f"10.5555/mock.{scope}.{rank}"
+    rng = _seeded("hit:" + doi)
+    words = search.split()
+    if rank == 0 and _seeded("match:" + scope).random() < mock_settings.MATCH_RATE:
+        title = search
+    else:
+        kept = [w for w in words if rng.random() > 0.4] or words[:1]
+        title = " ".join(kept + [rng.choice(WORDS) for _ in range(rng.randint(1, 4))]).capitalize()
+    year_from = filters.get("year_from") or filters.get("year_to")
+    year_to = filters.get("year_to") or year_from
+    _search_hits[doi] = {
+        "title": title,
+        "year": (year_from + year_to) // 2 if rank == 0 and year_from else (
+            rng.randint(year_from, year_to) if year_from else None),
+        "author": filters.get("author") if rank == 0 or rng.random() < 0.3 else None,
+    }
+    _search_hits.move_to_end(doi)
+    while len(_search_hits) > MAX_REMEMBERED_HITS:
+        _search_hits.popitem(last=False)
+    return doi
+
+
+@app.middleware("http")
+async def inject_latency_and_429(request: Request, call_next):
+    delay = mock_settings.LATENCY_MS + _rng.random() * mock_settings.LATENCY_JITTER_MS
+    await asyncio.sleep(delay / 1000)
+    if _rng.random() < mock_settings.RATE_429:
+        return JSONResponse({"error": "Too Many Requests"}, status_code=429,
+                            headers={"Retry-After": str(mock_settings.RETRY_AFTER)})
+    return await call_next(request)
+
+
+@app.get("/works")
+async def list_works(
+    search: Optional[str] = None,
+    filter: Optional[str] = None,
+    group_by: Optional[str] = None,
+    page: int = 1,
+    cursor: Optional[str] = None,
+    request: Request = None
+):
+    per_page = int(request.query_params.get("per-page") or request.query_params.get("per_page") or 25)
+
+    if group_by:
+        rng = _seeded(f"group:{search}:{group_by}")
+        groups = [
+            {"key": f"https://openalex.org/X{i}", "key_display_name": f"{group_by} value {i}",
+             "count": rng.randint(1, 1000)}
+            for i in range(20)
+        ]
+        return {"meta": {"count": mock_settings.TOTAL_RESULTS, "groups_count": len(groups)}, "group_by": groups}
+
+    if filter and filter.startswith("doi:"):
+        dois = [d.replace("https://doi.org/", "").lower() for d in filter[len("doi:"):].split(",")[0].split("|")]
+        results = [_work(d) for d in dois if _known(d)]
+        return {"meta": {"count": len(results), "page": 1, "per_page": per_page}, "results": results}
+
+    total = mock_settings.TOTAL_RESULTS
+    offset = int(cursor) if cursor and cursor != "*" else (page - 1) * per_page
+    ranks = range(offset, min(offset + per_page, total))
+    if search:
+        filters = _search_filters(filter)
+        results = [_work(_search_hit(search, filters, rank)) for rank in ranks]
+    else:
+        results = [_work(f"10.5555/mock.{rank}") for rank in ranks]
+    meta: Dict[str, Any] = {"count": total, "page": page, "per_page": per_page}
+    if cursor is not None:
+        meta["next_cursor"] = str(offset + per_page) if offset + per_page < total else None
+    return {"meta": meta, "results": results}
+
+
+@app.get("/works/{work_id:path}")
+async def get_work(work_id: str):
+    if work_id.lower().startswith("doi:"):
+        doi = work_id[4:].replace("https://doi.org/", "").lower()
+        if not _known(doi):
+            return JSONResponse({"error": "Not found"}, status_code=404)
+        return _work(doi)
+    if work_id.upper().startswith("W") and work_id[1:].isdigit():
+        return _work(f"10.5555/mock.{work_id[1:]}")
+    return JSONResponse({"error": "Not found"}, status_code=404)
+
+
+@app.get("/autocomplete/{entity}")
+async def autocomplete(entity: str, q: str = ""):
+    prefix = {"sources": "S", "authors": "A"}.get(entity, "X")
+    rng = _seeded(f"autocomplete:{entity}:{q.lower()}")
+    results = [
+        {"id": f"https://openalex.org/{prefix}{rng.randint(1, 10 ** 6)}",
+         "display_name": f"{q.title()} {rng.choice(WORDS).title()}",
+         "hint": None, "works_count": rng.randint(1, 5000), "cited_by_count": rng.randint(0, 10 ** 5)}
+        for _ in range(rng.randint(0, 10))
+    ]
+    return {"meta": {"count": len(results)}, "results": results}
+
+
+@app.get("/v2/{doi:path}")
+async def unpaywall(doi: str):
+    doi = doi.lower()
+    if not _known(doi):
+        return JSONResponse({"HTTP_status_code": 404, "error": True, "message": f"'{doi}' isn't in Unpaywall"},
+                            status_code=404)
+    work = _work(doi)
+    best = work["best_oa_location"]
+    location = {"url": best["pdf_url"], "url_for_pdf": best["pdf_url"],
+                "url_for_landing_page": best["landing_page_url"], "host_type": "repository"}
+    return {
+        "doi": doi,
+        "title": work["title"],
+        "year": work["publication_year"],
+        "journal_name": work["primary_location"]["source"]["display_name"],
+        "journal_issns": "1234-5678",
+        "journal_is_oa": False,
+        "publisher": "Mock Publisher",
+        "is_oa": best["is_oa"],
+        "oa_status": "green" if best["is_oa"] else "closed",
+        "best_oa_location": location if best["is_oa"] else None,
+        "oa_locations": [location] if best["is_oa"] else [],
+        "z_authors": [{"given": "A.", "family": f"Author{i}"} for i in range(mock_settings.AUTHORS_PER_WORK)],
+    }
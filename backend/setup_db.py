@@ -7,6 +7,10 @@ from sqlalchemy import inspect # Import inspect
 from app.models.paper import Paper
 from app.models.project import Project, paper_project # Ensure association table is imported
 from app.models.coding import CodingSheet, CodingData # Keep coding models
+from app.models.openalex_work import OpenAlexWork
+from app.models.local_work import LocalWork
+from app.models.unpaywall_record import UnpaywallRecord
+from app.models.unpaywall_local import LocalUnpaywallRecord
 from app.db.base_class import Base
 
 # Create database engine
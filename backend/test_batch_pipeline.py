@@ -0,0 +1,136 @@
+"""
+Tests for the concurrent batch DOI pipeline (doi_service.iter_batch_results)
+and the streamed batch-find-doi output (batch_csv).
+
+Row matching is replaced with a stub that only sleeps, so these run offline:
+    python test_batch_pipeline.py
+    pytest test_batch_pipeline.py
+"""
+import asyncio
+import json
+import time
+from io import BytesIO
+
+from app.services import batch_csv, doi_service, pdf_service, unpaywall_client
+
+ROW_DELAY = 0.5
+
+
+async def _slow_resolve(index, paper):
+    await asyncio.sleep(ROW_DELAY)
+    return {**paper, 'doi': f"10.1/{index}", 'row': index}, None
+
+
+def _run_with_stub(coro_fn):
+    original = doi_service._resolve_row
+    doi_service._resolve_row = _slow_resolve
+    try:
+        return asyncio.run(coro_fn())
+    finally:
+        doi_service._resolve_row = original
+
+
+def test_rows_run_concurrently_without_busy_waiting():
+    """Waiting on slow rows must sleep in the event loop, not spin it."""
+    rows = [{'title': f"Paper {i}", 'authors': "Smith", 'year': "2020"} for i in range(8)]
+
+    async def collect():
+        return [paper async for paper in doi_service.iter_batch_results(rows, concurrency=8)]
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    results = _run_with_stub(collect)
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+
+    assert sorted(paper['row'] for paper in results) == list(range(8))
+    assert wall < ROW_DELAY * 2, f"rows did not run concurrently ({wall:.2f}s)"
+    assert cpu < ROW_DELAY / 2, f"event loop busy-waited ({cpu:.2f}s CPU for {wall:.2f}s wall)"
+
+
+def test_input_errors_are_raised():
+    """An exception while reading input reaches the consumer instead of hanging it."""
+    async def broken_rows():
+        yield {'title': "Paper", 'authors': "Smith", 'year': "2020"}
+        raise ValueError("bad input")
+
+    async def collect():
+        return [paper async for paper in doi_service.iter_batch_results(broken_rows(), concurrency=2)]
+
+    try:
+        _run_with_stub(collect)
+    except ValueError as e:
+        assert str(e) == "bad input"
+    else:
+        raise AssertionError("input error was swallowed")
+
+
+def test_pdf_urls_resolved_in_one_bulk_pass():
+    """Matched rows get their PDF URLs from one get_paper_pdf_urls call that reuses the search hits."""
+    rows = [{'title': f"Paper {i}", 'authors': "Smith", 'year': "2020"} for i in range(4)]
+    calls = []
+
+    async def matching_resolve(index, paper):
+        doi = f"10.1/{index}" if index % 2 else None
+        match = {'doi': doi, 'open_access_url': None} if doi else None
+        return {**paper, 'doi': doi, 'row': index}, match
+
+    async def bulk_pdf_urls(dois, openalex_papers=None):
+        calls.append((sorted(dois), sorted(openalex_papers)))
+        return {"10.1/1": "https://example.org/1.pdf"}
+
+    async def collect():
+        return [paper async for paper in doi_service.iter_batch_results(rows, concurrency=2)]
+
+    original = doi_service._resolve_row, pdf_service.get_paper_pdf_urls
+    doi_service._resolve_row, pdf_service.get_paper_pdf_urls = matching_resolve, bulk_pdf_urls
+    try:
+        results = {paper['row']: paper['pdf_url'] for paper in asyncio.run(collect())}
+    finally:
+        doi_service._resolve_row, pdf_service.get_paper_pdf_urls = original
+
+    assert calls == [(["10.1/1", "10.1/3"], ["10.1/1", "10.1/3"])]
+    assert results == {0: "No DOI", 1: "https://example.org/1.pdf", 2: "No DOI", 3: "Not found"}
+
+
+def test_store_reads_do_not_block_the_event_loop():
+    """Slow SQLite reads behind Unpaywall lookups run in the threadpool, so concurrent rows overlap."""
+    def slow_local_record(doi):
+        time.sleep(ROW_DELAY / 2)
+        return {'doi': doi, 'open_access_url': None}
+
+    async def collect():
+        return await asyncio.gather(*(unpaywall_client.get_unpaywall_data(f"10.1/{i}") for i in range(8)))
+
+    original = unpaywall_client.get_local_record
+    unpaywall_client.get_local_record = slow_local_record
+    try:
+        wall = time.perf_counter()
+        results = asyncio.run(collect())
+        wall = time.perf_counter() - wall
+    finally:
+        unpaywall_client.get_local_record = original
+
+    assert [r['doi'] for r in results] == [f"10.1/{i}" for i in range(8)]
+    assert wall < ROW_DELAY * 2, f"store reads ran one after another ({wall:.2f}s)"
+
+
+def test_stream_reports_bad_lines_in_band():
+    """A bad line mid-upload still yields the rows before it, a final error record and valid JSON."""
+    upload = BytesIO(b"title,authors,year\nA,Smith,2000\n\xff,Doe,2001\nB,Roe,2002\n")
+
+    async def collect():
+        reader = await batch_csv.open_batch_csv(upload, chunk_size=10)
+        return "".join([part async for part in batch_csv.stream_batch_results(reader, batch_csv.FORMAT_JSON)])
+
+    results = json.loads(_run_with_stub(collect))
+
+    assert [paper.get('title') for paper in results[:-1]] == ["A"]
+    assert "line 3" in results[-1]['error']
+
+
+if __name__ == "__main__":
+    test_rows_run_concurrently_without_busy_waiting()
+    test_input_errors_are_raised()
+    test_pdf_urls_resolved_in_one_bulk_pass()
+    test_store_reads_do_not_block_the_event_loop()
+    test_stream_reports_bad_lines_in_band()
+    print("All batch pipeline tests passed")